@@ -3,29 +3,34 @@ AI module for Guandan game
 Provides factory function to create AI instances based on configuration
 """
 
+import logging
+from typing import Optional
+
 from config.ai_config import AIConfig
+from ai.strategy import ImprovedGuandanAI
+
+logger = logging.getLogger(__name__)
 
 
-def create_ai(level: int = 2):
+def create_ai(level: int = 2, algorithm: Optional[str] = None):
     """
     根据配置创建AI实例
     
     Args:
         level: 当前等级（2-A）
+        algorithm: 算法类型（"improved" 或 "advanced"），默认使用 AIConfig.ALGORITHM
     
     Returns:
         AI实例（ImprovedGuandanAI 或 AdvancedGuandanAI）
     """
-    algorithm = AIConfig.ALGORITHM
+    algorithm = algorithm or AIConfig.ALGORITHM
     
     if algorithm == "improved":
-        from ai.strategy import ImprovedGuandanAI
-        print(f"🎮 使用方案A：渐进式改进算法")
+        logger.debug("🎮 使用方案A：渐进式改进算法")
         return ImprovedGuandanAI(level)
     elif algorithm == "advanced":
         # 方案B暂时使用方案A的实现（可以后续扩展）
-        from ai.strategy import ImprovedGuandanAI
-        print(f"🚀 使用方案B：高级算法（当前使用改进版实现）")
+        logger.debug("🚀 使用方案B：高级算法（当前使用改进版实现）")
         return ImprovedGuandanAI(level)
     else:
         raise ValueError(f"未知的算法类型: {algorithm}")
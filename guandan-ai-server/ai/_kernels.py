@@ -0,0 +1,109 @@
+"""
+Integer kernels for Guandan AI pattern enumeration
+Operate on rank bitmasks so the strategy only touches Card objects when
+materializing a chosen pattern
+
+Everything here is int-only and fully annotated, so the module can be
+compiled as-is (mypyc / Cython pure-Python mode) without touching callers
+"""
+
+from typing import List, Tuple
+
+
+def rank_mask(value_cards: List[list], min_count: int) -> int:
+    """Bitmask of the ranks holding at least min_count cards (value_cards indexed by rank)"""
+    mask = 0
+    for value, cards in enumerate(value_cards):
+        if len(cards) >= min_count:
+            mask |= 1 << value
+    return mask
+
+
+def rank_masks(value_cards: List[list]) -> List[int]:
+    """
+    rank_mask for min_count 1, 2 and 3 in one pass
+    
+    Returns:
+        [0, singles, pairs, triples] so that masks[k] == rank_mask(value_cards, k)
+    """
+    singles = pairs = triples = 0
+    for value, cards in enumerate(value_cards):
+        count = len(cards)
+        if count:
+            bit = 1 << value
+            singles |= bit
+            if count >= 2:
+                pairs |= bit
+                if count >= 3:
+                    triples |= bit
+    return [0, singles, pairs, triples]
+
+
+def consecutive_runs(mask: int, min_length: int, max_length: int = 15) -> List[Tuple[int, int]]:
+    """
+    Enumerate every run of consecutive set bits in a rank mask
+    
+    Bit v of `run` is set iff ranks v..v+length-1 are all present, so each
+    extra length costs one shift-and.
+    
+    Returns:
+        (start, length) pairs ordered by length, then by start
+    """
+    runs: List[Tuple[int, int]] = []
+    length = max(min_length, 1)
+    run = window_start_mask(mask, length)
+    while run and length <= max_length:
+        bits = run
+        while bits:
+            low = bits & -bits
+            runs.append((low.bit_length() - 1, length))
+            bits ^= low
+        run &= run >> 1
+        length += 1
+    return runs
+
+
+def window_start_mask(mask: int, length: int) -> int:
+    """
+    Bitmask of the start ranks of every window of `length` consecutive ranks in mask
+    
+    Doubles the covered width on each step (run & run >> covered), so a
+    window costs O(log length) shift-ands instead of length - 1
+    """
+    run = mask
+    covered = 1
+    while covered * 2 <= length and run:
+        run &= run >> covered
+        covered *= 2
+    if covered < length:
+        run &= run >> (length - covered)
+    return run
+
+
+def straight_windows(mask: int, length: int) -> List[int]:
+    """Start ranks of every window of exactly `length` consecutive ranks in mask"""
+    run = window_start_mask(mask, length)
+    starts: List[int] = []
+    while run:
+        low = run & -run
+        starts.append(low.bit_length() - 1)
+        run ^= low
+    return starts
+
+
+def maximal_runs(mask: int, min_length: int) -> List[Tuple[int, int]]:
+    """
+    Runs of consecutive set bits that cannot be extended on either side
+    
+    Returns:
+        (start, length) pairs with length >= min_length, ordered by start
+    """
+    runs: List[Tuple[int, int]] = []
+    while mask:
+        start = (mask & -mask).bit_length() - 1
+        shifted = mask >> start
+        length = (shifted ^ (shifted + 1)).bit_length() - 1  # trailing ones
+        if length >= min_length:
+            runs.append((start, length))
+        mask &= ~(((1 << length) - 1) << start)
+    return runs
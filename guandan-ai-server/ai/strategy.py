@@ -3,24 +3,150 @@ AI Strategy module for Guandan game
 方案A：渐进式改进版本 - 在原有基础上添加智能首次出牌和手牌平衡成本
 """
 
-from typing import List, Optional, Dict, Any
-from collections import Counter
-from itertools import combinations
+from typing import List, Optional, Dict, Any, Iterable, Iterator
+from bisect import bisect_left
+from collections import Counter, OrderedDict
+from heapq import merge
+from itertools import chain, combinations, product
+from operator import attrgetter, is_, itemgetter
 from game.card import Card
 from game.pattern import Pattern, PatternType, identify_pattern
-from game.comparator import can_beat, is_bomb_type, get_bomb_rank
+from game.comparator import is_bomb_type
 from ai.base_strategy import BaseStrategy
+from ai._kernels import (rank_mask, rank_masks, consecutive_runs, straight_windows, maximal_runs,
+                         window_start_mask)
 from config.ai_config import AIConfig
 
 
+# 手牌索引槽位：2-14 为普通点数（A=14），15 为级牌，16/17 为小王/大王
+INDEX_SLOTS = 18
+VALUE_TO_SLOT = {50: 15, 99: 16, 100: 17}
+SLOT_VALUES = list(range(15)) + [50, 99, 100]
+# 顺子点数查找表：牌值 -> 顺子中的点数（级牌按 A=14 计）
+STRAIGHT_RANK = list(range(50)) + [14] * 51
+# 牌型出牌优先级（越小越优先），对子/单张由 _get_pattern_priority 再按数量调整
+PATTERN_PRIORITY = {
+    PatternType.STRAIGHT: 1,
+    PatternType.TRIPLE_STRAIGHT: 2,
+    PatternType.PAIR_STRAIGHT: 3,
+    PatternType.FULLHOUSE: 4,
+    PatternType.TRIPLE: 5,
+    PatternType.PAIR: 6,
+    PatternType.SINGLE: 6,
+}
+# 跟牌生成器分派表：牌型 -> (生成方法名, 是否按上家牌型长度生成)
+SAME_TYPE_GENERATORS = {
+    PatternType.SINGLE: ("_generate_singles", False),
+    PatternType.PAIR: ("_generate_pairs", False),
+    PatternType.TRIPLE: ("_generate_triples", False),
+    PatternType.FULLHOUSE: ("_generate_fullhouses", False),
+    PatternType.STRAIGHT: ("_generate_straights", True),
+    PatternType.PAIR_STRAIGHT: ("_generate_pair_straights", True),
+    PatternType.TRIPLE_STRAIGHT: ("_generate_triple_straights", True),
+}
+# 基础成本：炸弹作为正常出牌为 0，表外的大牌型为 BASE_COST_DEFAULT
+BASE_COST = {
+    PatternType.SINGLE: 5.0,  # 单牌有一定成本，避免过度出单牌
+    PatternType.PAIR: 3.0,
+    PatternType.TRIPLE: 2.0,
+    PatternType.BOMB: 0.0,
+    PatternType.STRAIGHT_FLUSH: 0.0,
+    PatternType.KING_BOMB: 0.0,
+}
+BASE_COST_DEFAULT = 1.0  # 大牌型成本低，鼓励出大牌型
+# 阶段划分：手牌数 <=8 为残局(0)，9-15 为中局(1)，>15 为开局(2)，见 bisect_left
+STAGE_BOUNDS = [8, 15]
+# 阶段成本：(阶段, 牌型) -> 成本，表外为 0
+STAGE_COST = {
+    # 开局阶段（手牌多）：鼓励出大牌型（负成本=奖励），惩罚出单牌
+    (2, PatternType.STRAIGHT): -5.0,
+    (2, PatternType.PAIR_STRAIGHT): -5.0,
+    (2, PatternType.TRIPLE_STRAIGHT): -5.0,
+    (2, PatternType.SINGLE): 10.0,
+    # 中局阶段（手牌中等）：平衡策略
+    (1, PatternType.SINGLE): 5.0,
+    # 残局阶段（手牌少）：快速出完，不考虑阶段成本
+}
+# 牌型分析中不算完整牌型的名称
+PARTIAL_PATTERNS = frozenset(('PAIR', 'TRIPLE'))
+
+
+def _hand_key(hand: List[Card]) -> tuple:
+    """Hashable key of a hand: (color, number) of each card, in hand order"""
+    return tuple([card._key for card in hand])
+
+
+class _HandContext:
+    """
+    Derived views of one hand: the hand being decided on (built once per
+    find_best_play), a simulated hand while its quality is scored, or a
+    throwaway view for lookups on any other hand (_hand_view)
+    
+    Values, the rank-count index, the joker split and the straight buckets
+    come out of a single pass over the hand; rank and suit masks and the
+    pattern analysis and the hand quality are filled lazily
+    """
+    __slots__ = ("hand", "values", "index", "split",
+                 "straight_buckets", "straight_masks", "suit_masks", "patterns",
+                 "pattern_sets", "quality")
+    
+    def __init__(self, hand: List[Card], level: int):
+        values = []
+        counts = [0] * INDEX_SLOTS
+        buckets = [[] for _ in range(INDEX_SLOTS)]
+        non_jokers = []
+        jokers = []
+        straight_buckets = [[] for _ in range(15)]
+        for card in hand:
+            value = card.get_value(level)
+            values.append(value)
+            slot = VALUE_TO_SLOT.get(value, value)
+            counts[slot] += 1
+            buckets[slot].append(card)
+            if value >= 99:  # Joker
+                jokers.append(card)
+            else:
+                rank = STRAIGHT_RANK[value]
+                non_jokers.append((card, rank))
+                straight_buckets[rank].append(card)
+        
+        self.hand = hand
+        self.values = values
+        self.index = (counts, buckets)
+        self.split = (non_jokers, jokers)
+        self.straight_buckets = straight_buckets
+        self.straight_masks = None
+        self.suit_masks = None
+        self.patterns = None
+        self.pattern_sets = None
+        self.quality = None
+
+
 class ImprovedGuandanAI(BaseStrategy):
     """方案A：渐进式改进的AI策略"""
     
+    # 置换表：(级牌, 配置, 手牌, 上家牌型) -> 出牌在手牌中的位置
+    # 服务端每个连接（及每次换级牌）各建一个AI实例，所以表在类上共享：
+    # 所有连接共用，并在整个服务进程生命周期内常驻内存。
+    # 每出一手牌手牌就变，实战中很少重复同一 (手牌, 上家牌型)，
+    # 只需容纳最近几局的决策（27张手牌每项约2KB，4096项约9MB）
+    DECISION_CACHE_SIZE = 4096
+    _decisions: "OrderedDict[tuple, tuple]" = OrderedDict()
+    # 牌型分析缓存：(级牌, 牌型成本, 手牌) -> (分析时的手牌, 牌型分析结果)
+    HAND_PATTERN_CACHE_SIZE = 256
+    _hand_patterns: "OrderedDict[tuple, tuple]" = OrderedDict()
+    # 手牌质量缓存：(级牌, 评分配置, 手牌) -> 质量分（只存数值，可以比牌型分析缓存大）
+    HAND_QUALITY_CACHE_SIZE = 4096
+    _hand_qualities: "OrderedDict[tuple, float]" = OrderedDict()
+    
     def __init__(self, level: int = 2):
         super().__init__()
         self.level = level
         self.config = AIConfig.IMPROVED_CONFIG
         
+        # 置换表与牌型分析缓存开关
+        self.enable_caching = AIConfig.COMMON_CONFIG["enable_caching"]
+        
         # 从配置加载成本
         self.PASS_COST = self.config["thresholds"]["pass_cost"]
         pattern_costs = AIConfig.COMMON_CONFIG["pattern_costs"]
@@ -35,6 +161,40 @@ class ImprovedGuandanAI(BaseStrategy):
         self.COST_FULLHOUSE = pattern_costs["FULLHOUSE"]
         self.COST_TRIPLE = pattern_costs["TRIPLE"]
         self.COST_PAIR = pattern_costs["PAIR"]
+        # 单次出牌可能的最大破坏成本
+        self.COST_MAX = max(pattern_costs.values())
+        # 牌型分析结果里带着成本，共享缓存要按成本区分配置
+        self._pattern_config = (
+            self.COST_KING_BOMB, self.COST_BOMB_6PLUS, self.COST_BOMB_5,
+            self.COST_BOMB_4, self.COST_STRAIGHT_FLUSH, self.COST_TRIPLE_STRAIGHT,
+            self.COST_PAIR_STRAIGHT, self.COST_STRAIGHT, self.COST_FULLHOUSE,
+            self.COST_TRIPLE, self.COST_PAIR,
+        )
+        
+        # 从配置加载评分权重（手牌质量与成本计算每次调用都要用）
+        quality_weights = self.config["quality_weights"]
+        self.QW_COMPLETENESS = quality_weights["completeness"]
+        self.QW_ISOLATED_PENALTY = quality_weights["isolated_penalty"]
+        self.QW_BOMB_BONUS = quality_weights["bomb_bonus"]
+        self.QW_STEPS_FACTOR = quality_weights["steps_factor"]
+        cost_weights = self.config["cost_weights"]
+        self.CW_BASE = cost_weights["base"]
+        self.CW_BREAK = cost_weights["break"]
+        self.CW_BALANCE = cost_weights["balance"]
+        self.CW_STAGE = cost_weights["stage"]
+        self.ISOLATED_THRESHOLD = self.config["thresholds"]["isolated_card_threshold"]
+        # 质量分取决于牌型成本（决定牌型分析）、质量权重和孤立牌阈值
+        self._quality_config = self._pattern_config + (
+            self.QW_COMPLETENESS, self.QW_ISOLATED_PENALTY, self.QW_BOMB_BONUS,
+            self.QW_STEPS_FACTOR, self.ISOLATED_THRESHOLD,
+        )
+        # 出牌决策另外取决于过牌阈值和成本权重（功能开关每次出牌时现读，见 _decision_config）
+        self._decision_constants = self._quality_config + (
+            self.PASS_COST, self.CW_BASE, self.CW_BREAK, self.CW_BALANCE, self.CW_STAGE,
+        )
+        
+        # 当前回合的手牌上下文（find_best_play 期间有效）
+        self._ctx: Optional[_HandContext] = None
     
     def get_strategy_name(self) -> str:
         """获取策略名称"""
@@ -62,328 +222,582 @@ class ImprovedGuandanAI(BaseStrategy):
         Returns:
             List of cards to play (empty for PASS)
         """
+        # Identify the pattern to beat
+        last_pattern = None
+        if last_move:
+            last_pattern = identify_pattern(last_move, self.level)
+            if not last_pattern:
+                return []  # Invalid last move, pass
+        
+        if not self.enable_caching:
+            return self._decide(hand, last_pattern)
+        
+        # The decision only depends on the level, the config, the hand in
+        # order (suits and order pick between equal cards) and the type, value
+        # and length of the last pattern
+        key = (self.level, self._decision_config(), _hand_key(hand),
+               last_pattern and (last_pattern.pattern_type, last_pattern.main_value,
+                                 last_pattern.length))
+        decisions = self._decisions
+        positions = decisions.get(key)
+        if positions is not None:
+            decisions.move_to_end(key)
+            return [hand[i] for i in positions]
+        
+        play = self._decide(hand, last_pattern)
+        position_of = {id(card): i for i, card in enumerate(hand)}
+        positions = tuple(position_of.get(id(card), -1) for card in play)
+        if -1 not in positions:
+            decisions[key] = positions
+            if len(decisions) > self.DECISION_CACHE_SIZE:
+                decisions.popitem(last=False)
+        return play
+    
+    def _decision_config(self) -> tuple:
+        """Every config input of a decision, for the transposition table key"""
+        config = self.config
+        return (self._decision_constants,
+                config["enable_smart_first_move"], config["enable_cost_scoring"],
+                config["enable_hand_balance"], tuple(config["first_move_priority"]),
+                config["thresholds"]["min_pairs_to_play_pair"])
+    
+    def _decide(self, hand: List[Card], last_pattern: Optional[Pattern]) -> List[Card]:
+        """Run _find_best_play with the hand context in place"""
+        self._ctx = _HandContext(hand, self.level)
+        try:
+            return self._find_best_play(hand, last_pattern)
+        finally:
+            self._ctx = None
+    
+    def _find_best_play(self, hand: List[Card], 
+                        last_pattern: Optional[Pattern]) -> List[Card]:
+        """find_best_play 的实现，手牌索引已建立（last_pattern 为 None 表示首出）"""
         # If no last move, use smart first move strategy
-        if not last_move:
+        if last_pattern is None:
             if self.config["enable_smart_first_move"]:
                 return self._play_smart_first_move(hand)
             else:
                 return self._play_smallest_single(hand)
         
-        # Identify the pattern to beat
-        last_pattern = identify_pattern(last_move, self.level)
-        if not last_pattern:
-            return []  # Invalid last move, pass
-        
-        # Find all valid plays that can beat last_pattern
+        # Stream the valid plays that can beat last_pattern
         valid_plays = self._find_all_beating_plays(hand, last_pattern)
         
-        if not valid_plays:
-            return []  # No valid play, pass
-        
-        # Return the best play considering cost
+        # Return the best play considering cost (empty if none, i.e. pass)
         return self._select_smallest_play(valid_plays, hand)
     
     def _play_smallest_single(self, hand: List[Card]) -> List[Card]:
         """Play the smallest single card from hand"""
         if not hand:
             return []
-        sorted_hand = sorted(hand, key=lambda c: c.get_value(self.level))
-        return [sorted_hand[0]]
+        values = self._get_values(hand)
+        # min and index both run in C, and index returns the first minimum
+        return [hand[values.index(min(values))]]
     
     def _find_all_beating_plays(self, hand: List[Card], 
-                                last_pattern: Pattern) -> List[Pattern]:
-        """Find all possible plays that can beat the last pattern"""
-        valid_plays = []
-        all_patterns = self._generate_all_patterns(hand, last_pattern)
-        
-        for pattern in all_patterns:
-            if can_beat(pattern, last_pattern):
-                valid_plays.append(pattern)
-        
-        return valid_plays
-    
-    def _generate_all_patterns(self, hand: List[Card], 
-                               last_pattern: Pattern) -> List[Pattern]:
-        """Generate all possible patterns from hand that match the type needed"""
-        patterns = []
+                                last_pattern: Pattern) -> Iterator[Pattern]:
+        """
+        Yield all possible plays that can beat the last pattern
+        Same-type plays come first in ascending main value, then bombs in
+        ascending bomb rank
         
+        The generators already apply can_beat's rules at the source, so no
+        per-pattern comparison is needed here
+        """
         if not is_bomb_type(last_pattern):
-            patterns.extend(self._generate_same_type_patterns(hand, last_pattern))
-            patterns.extend(self._generate_all_bombs(hand))
-        else:
-            patterns.extend(self._generate_all_bombs(hand))
-        
-        return patterns
+            # Same-type generators only emit patterns above last_pattern,
+            # and any bomb beats a non-bomb
+            stream_bombs = []
+            for pattern in self._generate_same_type_patterns(hand, last_pattern):
+                if is_bomb_type(pattern):
+                    stream_bombs.append(pattern)  # straight flushes among straights
+                else:
+                    yield pattern
+            # Held back so the bombs stay in rank order; on equal rank they
+            # still come before the bomb generator's own
+            by_rank = attrgetter("bomb_rank")
+            stream_bombs.sort(key=by_rank)
+            yield from merge(stream_bombs, self._generate_all_bombs(hand), key=by_rank)
+            return
+        
+        # Bomb against bomb: only a higher bomb rank wins
+        yield from self._generate_all_bombs(hand, last_pattern.bomb_rank)
     
     def _generate_same_type_patterns(self, hand: List[Card], 
-                                     last_pattern: Pattern) -> List[Pattern]:
-        """Generate patterns of the same type as last_pattern"""
-        pattern_type = last_pattern.pattern_type
-        
-        if pattern_type == PatternType.SINGLE:
-            return self._generate_singles(hand)
-        elif pattern_type == PatternType.PAIR:
-            return self._generate_pairs(hand)
-        elif pattern_type == PatternType.TRIPLE:
-            return self._generate_triples(hand)
-        elif pattern_type == PatternType.FULLHOUSE:
-            return self._generate_fullhouses(hand)
-        elif pattern_type == PatternType.STRAIGHT:
-            return self._generate_straights(hand, last_pattern.length)
-        elif pattern_type == PatternType.PAIR_STRAIGHT:
-            return self._generate_pair_straights(hand, last_pattern.length)
-        elif pattern_type == PatternType.TRIPLE_STRAIGHT:
-            return self._generate_triple_straights(hand, last_pattern.length)
-        
-        return []
-    
-    def _generate_singles(self, hand: List[Card]) -> List[Pattern]:
-        """Generate all single card patterns"""
-        return [Pattern(PatternType.SINGLE, [card], card.get_value(self.level), 1) 
-                for card in hand]
-    
-    def _generate_pairs(self, hand: List[Card]) -> List[Pattern]:
-        """Generate all pair patterns"""
-        patterns = []
-        value_groups = self._group_by_value(hand)
-        
-        for value, cards in value_groups.items():
-            if len(cards) >= 2:
-                for combo in combinations(cards, 2):
-                    patterns.append(Pattern(PatternType.PAIR, list(combo), value, 1))
+                                     last_pattern: Pattern) -> Iterable[Pattern]:
+        """
+        Lazily generate patterns of the same type as last_pattern, in ascending
+        main value. Only main values above last_pattern's can beat it, so lower
+        ones are skipped
+        """
+        entry = SAME_TYPE_GENERATORS.get(last_pattern.pattern_type)
+        if entry is None:
+            return []
         
-        return patterns
+        name, by_length = entry
+        generate = getattr(self, name)
+        if by_length:
+            return generate(hand, last_pattern.length, last_pattern.main_value)
+        return generate(hand, last_pattern.main_value)
     
-    def _generate_triples(self, hand: List[Card]) -> List[Pattern]:
-        """Generate all triple patterns"""
-        patterns = []
-        value_groups = self._group_by_value(hand)
+    def _bucket_combos(self, hand: List[Card], cards: List[Card], size: int):
+        """
+        Combinations of `size` cards taken from one value bucket
         
-        for value, cards in value_groups.items():
-            if len(cards) >= 3:
-                for combo in combinations(cards, 3):
-                    patterns.append(Pattern(PatternType.TRIPLE, list(combo), value, 1))
+        Any subset of a bomb (4+ cards) breaks that bomb, so all such subsets
+        cost the same and are dominated by playing the bomb itself; a single
+        representative is enough for selection. Smaller buckets keep one
+        combination per card class (see _distinct_combos).
+        """
+        count = len(cards)
+        if count >= 4:
+            return [tuple(cards[:size])]
+        if count == size:
+            return [tuple(cards)]
+        return self._distinct_combos(hand, combinations(cards, size))
+    
+    def _card_classes(self, hand: List[Card]) -> dict:
+        """
+        id(card) -> bitmask of the existing patterns (_analyze_hand_patterns)
+        holding that card, 0 for cards in no pattern
         
-        return patterns
+        _calculate_play_cost only looks at how many cards of each pattern a
+        play uses, so swapping a card for another card of the same class never
+        changes the cost. Built along with _existing_pattern_sets
+        """
+        return self._existing_pattern_sets(hand)[2]
     
-    def _generate_fullhouses(self, hand: List[Card]) -> List[Pattern]:
-        """Generate all fullhouse (3+2) patterns"""
-        patterns = []
-        value_groups = self._group_by_value(hand)
+    def _distinct_combos(self, hand: List[Card], combos: Iterable[tuple], 
+                         by_suit: bool = False) -> Iterator[tuple]:
+        """
+        Drop combos holding the same card classes (and suits when by_suit) as
+        an earlier one: they cost the same, so selection never prefers them
+        over the first
+        """
+        classes = self._card_classes(hand)
+        seen = set()
+        for combo in combos:
+            if by_suit:
+                key = tuple(sorted((classes[id(card)], card.color) for card in combo))
+            else:
+                key = tuple(sorted(classes[id(card)] for card in combo))
+            if key not in seen:
+                seen.add(key)
+                yield combo
+    
+    def _distinct_cards(self, hand: List[Card], cards: List[Card], 
+                        by_suit: bool = False) -> List[Card]:
+        """Single-card _distinct_combos: the first card of each class (and suit)"""
+        if len(cards) < 2:
+            return cards
+        classes = self._card_classes(hand)
+        seen = set()
+        distinct = []
+        for card in cards:
+            key = classes[id(card)]
+            if by_suit:
+                key = (key, card.color)
+            if key not in seen:
+                seen.add(key)
+                distinct.append(card)
+        return distinct
+    
+    def _generate_singles(self, hand: List[Card], min_value: int = 0) -> Iterator[Pattern]:
+        """Generate all single card patterns above min_value (one per bomb value)"""
+        counts, buckets = self._get_index(hand)
+        
+        for slot in range(INDEX_SLOTS):
+            value = SLOT_VALUES[slot]
+            if counts[slot] and value > min_value:
+                for combo in self._bucket_combos(hand, buckets[slot], 1):
+                    yield Pattern(PatternType.SINGLE, list(combo), value, 1)
+    
+    def _generate_pairs(self, hand: List[Card], min_value: int = 0) -> Iterator[Pattern]:
+        """Generate all pair patterns above min_value (one per bomb value)"""
+        counts, buckets = self._get_index(hand)
+        
+        for slot in range(INDEX_SLOTS):
+            value = SLOT_VALUES[slot]
+            if counts[slot] >= 2 and value > min_value:
+                for combo in self._bucket_combos(hand, buckets[slot], 2):
+                    yield Pattern(PatternType.PAIR, list(combo), value, 1)
+    
+    def _generate_triples(self, hand: List[Card], min_value: int = 0) -> Iterator[Pattern]:
+        """Generate all triple patterns above min_value (one per bomb value)"""
+        counts, buckets = self._get_index(hand)
+        
+        for slot in range(INDEX_SLOTS):
+            value = SLOT_VALUES[slot]
+            if counts[slot] >= 3 and value > min_value:
+                for combo in self._bucket_combos(hand, buckets[slot], 3):
+                    yield Pattern(PatternType.TRIPLE, list(combo), value, 1)
+    
+    def _generate_fullhouses(self, hand: List[Card], min_value: int = 0) -> Iterator[Pattern]:
+        """Generate all fullhouse (3+2) patterns whose triple is above min_value"""
+        counts, buckets = self._get_index(hand)
         
+        # Bomb buckets contribute one representative triple / pair, so a
+        # 4-card value no longer multiplies the cross product by 4 or 6
         triples = []
-        for value, cards in value_groups.items():
-            if len(cards) >= 3:
-                for combo in combinations(cards, 3):
-                    triples.append((value, list(combo)))
-        
-        pairs = []
-        for value, cards in value_groups.items():
-            if len(cards) >= 2:
-                for combo in combinations(cards, 2):
-                    pairs.append((value, list(combo)))
-        
-        for t_value, triple in triples:
-            for p_value, pair in pairs:
-                if t_value != p_value:
-                    if not any(c in triple for c in pair):
-                        full = triple + pair
-                        patterns.append(Pattern(PatternType.FULLHOUSE, full, t_value, 1))
-        
-        return patterns
+        for slot in range(INDEX_SLOTS):
+            if counts[slot] >= 3 and SLOT_VALUES[slot] > min_value:
+                for combo in self._bucket_combos(hand, buckets[slot], 3):
+                    triples.append((slot, list(combo)))
+        
+        if not triples:
+            return
+        
+        # Pairs grouped per slot, so a triple skips its own value once per
+        # slot rather than comparing values per pair. Equal-cost fullhouses
+        # on one triple tie-break on the pair whose value shows up first in hand
+        pair_groups = []
+        for slot in self._slots_in_hand_order(hand):
+            if counts[slot] >= 2:
+                pair_groups.append((slot, [list(combo) for combo in self._bucket_combos(hand, buckets[slot], 2)]))
+        
+        # Each bucket holds a single value, so different values never share cards
+        make, fullhouse = Pattern, PatternType.FULLHOUSE  # locals for the inner loop
+        for t_slot, triple in triples:
+            t_value = SLOT_VALUES[t_slot]
+            for p_slot, pairs in pair_groups:
+                if p_slot == t_slot:
+                    continue
+                for pair in pairs:
+                    yield make(fullhouse, triple + pair, t_value, 1)
     
-    def _generate_straights(self, hand: List[Card], length: int) -> List[Pattern]:
-        """Generate all straight patterns of given length"""
-        patterns = []
-        valid_cards = [c for c in hand if not c.is_joker()]
-        
-        value_cards = {}
-        for card in valid_cards:
-            val = card.get_value(self.level)
-            if val >= 50:
-                val = 14
-            if val not in value_cards:
-                value_cards[val] = []
-            value_cards[val].append(card)
-        
-        sorted_values = sorted(value_cards.keys())
-        
-        for start_idx in range(len(sorted_values) - length + 1):
-            values = sorted_values[start_idx:start_idx + length]
-            if self._is_consecutive_list(values):
-                for combo in self._generate_combo_from_values(values, value_cards, 1):
-                    pattern = identify_pattern(combo, self.level)
-                    if pattern and pattern.pattern_type in [PatternType.STRAIGHT, PatternType.STRAIGHT_FLUSH]:
-                        patterns.append(pattern)
-        
-        return patterns
+    def _generate_straights(self, hand: List[Card], length: int, 
+                            min_value: int = 0) -> Iterator[Pattern]:
+        """
+        Generate all straight patterns of given length topping above min_value
+        Straight flushes are bombs and are kept at any height
+        """
+        value_cards = self._straight_buckets(hand)
+        
+        mask = self._straight_mask(hand, value_cards, 1)
+        # Bit v is set when some suit holds every rank of the window starting at v
+        flush_starts = 0
+        for suit_mask, _ in self._suit_rank_masks(hand).values():
+            flush_starts |= window_start_mask(suit_mask, length)
+        
+        # Locals for the per-combo loops
+        make, straight, flush = Pattern, PatternType.STRAIGHT, PatternType.STRAIGHT_FLUSH
+        for start in straight_windows(mask, length):
+            values = list(range(start, start + length))
+            top = start + length - 1
+            if not flush_starts >> start & 1:
+                # No suit covers the window, so every combo is a plain straight
+                if top > min_value:
+                    for combo in self._generate_combo_from_values(hand, values, value_cards, 1):
+                        yield make(straight, combo, top, length)
+                continue
+            if top <= min_value:
+                # Too low to beat as a straight: only same-suit combos matter,
+                # so pick each one's suit from the lowest rank instead of
+                # walking every suit mix
+                choices = [self._distinct_cards(hand, value_cards[v], True) for v in values]
+                for first in choices[0]:
+                    color = first.color
+                    same_suit = [[card for card in cards if card.color == color]
+                                 for cards in choices[1:]]
+                    for rest in product(*same_suit):
+                        yield make(flush, [first, *rest], top, length)
+                continue
+            for combo in self._generate_combo_from_values(hand, values, value_cards, 1,
+                                                          by_suit=True):
+                # Same suit upgrades the straight to a straight flush
+                if len({card.color for card in combo}) == 1:
+                    yield make(flush, combo, top, length)
+                else:
+                    yield make(straight, combo, top, length)
     
-    def _generate_pair_straights(self, hand: List[Card], num_pairs: int) -> List[Pattern]:
+    def _generate_pair_straights(self, hand: List[Card], num_pairs: int, 
+                                 min_value: int = 0) -> Iterator[Pattern]:
         """Generate all pair straight patterns (连对)"""
-        patterns = []
-        valid_cards = [c for c in hand if not c.is_joker()]
-        
-        value_cards = {}
-        for card in valid_cards:
-            val = card.get_value(self.level)
-            if val >= 50:
-                val = 14
-            if val not in value_cards:
-                value_cards[val] = []
-            value_cards[val].append(card)
-        
-        valid_values = [v for v, cards in value_cards.items() if len(cards) >= 2]
-        valid_values.sort()
-        
-        for start_idx in range(len(valid_values) - num_pairs + 1):
-            values = valid_values[start_idx:start_idx + num_pairs]
-            if self._is_consecutive_list(values):
-                for combo in self._generate_combo_from_values(values, value_cards, 2):
-                    pattern = identify_pattern(combo, self.level)
-                    if pattern and pattern.pattern_type == PatternType.PAIR_STRAIGHT:
-                        patterns.append(pattern)
-        
-        return patterns
+        return self._generate_grouped_straights(hand, PatternType.PAIR_STRAIGHT, 2,
+                                                num_pairs, min_value)
     
-    def _generate_triple_straights(self, hand: List[Card], num_triples: int) -> List[Pattern]:
+    def _generate_triple_straights(self, hand: List[Card], num_triples: int, 
+                                  min_value: int = 0) -> Iterator[Pattern]:
         """Generate all triple straight patterns (钢板)"""
-        patterns = []
-        valid_cards = [c for c in hand if not c.is_joker()]
-        
-        value_cards = {}
-        for card in valid_cards:
-            val = card.get_value(self.level)
-            if val >= 50:
-                val = 14
-            if val not in value_cards:
-                value_cards[val] = []
-            value_cards[val].append(card)
-        
-        valid_values = [v for v, cards in value_cards.items() if len(cards) >= 3]
-        valid_values.sort()
-        
-        for start_idx in range(len(valid_values) - num_triples + 1):
-            values = valid_values[start_idx:start_idx + num_triples]
-            if self._is_consecutive_list(values):
-                for combo in self._generate_combo_from_values(values, value_cards, 3):
-                    pattern = identify_pattern(combo, self.level)
-                    if pattern and pattern.pattern_type == PatternType.TRIPLE_STRAIGHT:
-                        patterns.append(pattern)
-        
-        return patterns
+        return self._generate_grouped_straights(hand, PatternType.TRIPLE_STRAIGHT, 3,
+                                                num_triples, min_value)
     
-    def _generate_all_bombs(self, hand: List[Card]) -> List[Pattern]:
-        """Generate all bomb patterns from hand"""
-        patterns = []
-        
-        # Regular bombs (4+ same value)
-        value_groups = self._group_by_value(hand)
-        for value, cards in value_groups.items():
-            if len(cards) >= 4:
-                for size in range(4, len(cards) + 1):
-                    for combo in combinations(cards, size):
-                        patterns.append(Pattern(PatternType.BOMB, list(combo), value, size))
+    def _generate_grouped_straights(self, hand: List[Card], pattern_type: PatternType,
+                                    cards_per_value: int, num_values: int,
+                                    min_value: int) -> Iterator[Pattern]:
+        """
+        Generate runs of num_values consecutive ranks with cards_per_value
+        cards each, topping above min_value
+        """
+        value_cards = self._straight_buckets(hand)
+        
+        mask = self._straight_mask(hand, value_cards, cards_per_value)
+        
+        make = Pattern  # local for the inner loop
+        for start in straight_windows(mask, num_values):
+            top = start + num_values - 1
+            if top <= min_value:
+                continue
+            values = list(range(start, start + num_values))
+            for combo in self._generate_combo_from_values(hand, values, value_cards, cards_per_value):
+                yield make(pattern_type, combo, top, num_values)
+    
+    def _generate_all_bombs(self, hand: List[Card], min_rank: int = 0) -> Iterator[Pattern]:
+        """
+        Lazily generate one bomb per bomb rank above min_rank, in ascending
+        bomb rank
         
-        # Straight flush
-        patterns.extend(self._generate_straight_flushes(hand))
+        Order: 4 and 5 card bombs, straight flushes (ranked between 5 and 6
+        card bombs), 6+ card bombs, king bomb. Bombs of equal rank are
+        interchangeable for comparison, so only the first one is kept
+        """
+        # Regular bombs (4+ same value) up to 5 cards
+        counts, _ = self._get_index(hand)
+        largest = max(counts)
+        yield from self._generate_regular_bombs(hand, 4, min(largest, 5), min_rank)
+        
+        # Straight flush: the rank only depends on the top card
+        flushes = sorted((flush for flush in self._generate_straight_flushes(hand)
+                          if flush.bomb_rank > min_rank),
+                         key=attrgetter("main_value"))
+        last_top = None
+        for flush in flushes:
+            if flush.main_value != last_top:
+                last_top = flush.main_value
+                yield flush
+        
+        # Regular bombs of 6+ cards
+        yield from self._generate_regular_bombs(hand, 6, largest, min_rank)
         
         # King bomb (4 jokers)
-        jokers = [c for c in hand if c.is_joker()]
+        jokers = self._split_jokers(hand)[1]
         if len(jokers) == 4:
-            patterns.append(Pattern(PatternType.KING_BOMB, jokers, 1000, 4))
+            king_bomb = Pattern(PatternType.KING_BOMB, jokers, 1000, 4)
+            if king_bomb.bomb_rank > min_rank:
+                yield king_bomb
+    
+    def _generate_regular_bombs(self, hand: List[Card], min_size: int, 
+                                max_size: int, min_rank: int = 0) -> Iterator[Pattern]:
+        """
+        One bomb per (size, value) for min_size..max_size same-value cards
+        ranking above min_rank, by size then value
+        """
+        counts, buckets = self._get_index(hand)
+        # A bomb ranks size * 100 + value with value below 100 (see
+        # comparator.get_bomb_rank), so smaller sizes can never beat min_rank
+        for size in range(max(min_size, min_rank // 100), max_size + 1):
+            min_value = min_rank - size * 100
+            for slot in range(INDEX_SLOTS):
+                value = SLOT_VALUES[slot]
+                if counts[slot] >= size and value > min_value:
+                    yield Pattern(PatternType.BOMB, buckets[slot][:size], value, size)
+    
+    def _generate_straight_flushes(self, hand: List[Card]) -> Iterator[Pattern]:
+        """Lazily generate all straight flush patterns"""
+        for combo, top in self._straight_flush_runs(hand):
+            yield Pattern(PatternType.STRAIGHT_FLUSH, combo, top, len(combo))
+    
+    def _straight_flush_runs(self, hand: List[Card]) -> Iterator[tuple]:
+        """
+        Yield (cards, top_rank) for every run of 5+ consecutive ranks in one suit
+        Runs are read off each suit's rank mask, shortest first
+        """
+        for mask, rank_cards in self._suit_rank_masks(hand).values():
+            for start, length in consecutive_runs(mask, 5):
+                yield rank_cards[start:start + length], start + length - 1
+    
+    def _straight_buckets(self, hand: List[Card]) -> List[List[Card]]:
+        """
+        Non-joker cards bucketed by straight rank (level cards count as 14)
         
-        return patterns
+        Returns:
+            List of 15 card lists indexed by rank, each in hand order
+        """
+        return self._hand_view(hand).straight_buckets
     
-    def _generate_straight_flushes(self, hand: List[Card]) -> List[Pattern]:
-        """Generate all straight flush patterns"""
-        patterns = []
+    def _straight_mask(self, hand: List[Card], value_cards: List[List[Card]], 
+                       min_count: int) -> int:
+        """
+        Bitmask of straight ranks holding at least min_count (1-3) cards
         
-        suit_cards = {}
-        for card in hand:
-            if not card.is_joker():
-                if card.color not in suit_cards:
-                    suit_cards[card.color] = []
-                suit_cards[card.color].append(card)
-        
-        for color, cards in suit_cards.items():
-            if len(cards) >= 5:
-                value_cards = {}
-                for card in cards:
-                    val = card.get_value(self.level)
-                    if val >= 50:
-                        val = 14
-                    if val not in value_cards:
-                        value_cards[val] = []
-                    value_cards[val].append(card)
-                
-                sorted_values = sorted(value_cards.keys())
-                
-                for length in range(5, len(sorted_values) + 1):
-                    for start_idx in range(len(sorted_values) - length + 1):
-                        values = sorted_values[start_idx:start_idx + length]
-                        if self._is_consecutive_list(values):
-                            combo = [value_cards[v][0] for v in values]
-                            pattern = identify_pattern(combo, self.level)
-                            if pattern and pattern.pattern_type == PatternType.STRAIGHT_FLUSH:
-                                patterns.append(pattern)
+        value_cards must be _straight_buckets(hand). With a context, all three
+        thresholds are built in one pass and cached
+        """
+        ctx = self._context(hand)
+        if ctx is not None:
+            if ctx.straight_masks is None:
+                ctx.straight_masks = rank_masks(ctx.straight_buckets)
+            return ctx.straight_masks[min_count]
+        return rank_mask(value_cards, min_count)
+    
+    def _suit_rank_masks(self, hand: List[Card]) -> dict:
+        """
+        Per-suit rank masks for straight flush detection
         
-        return patterns
+        Returns:
+            {color: (mask, rank_cards)} where bit v of mask is set when the suit
+            holds rank v, and rank_cards[v] is the first such card in hand order
+        """
+        ctx = self._context(hand)
+        if ctx is not None and ctx.suit_masks is not None:
+            return ctx.suit_masks
+        
+        suits = {}
+        for card, rank in self._split_jokers(hand)[0]:
+            entry = suits.get(card.color)
+            if entry is None:
+                entry = suits[card.color] = [0, [None] * 15]
+            if not entry[0] >> rank & 1:
+                entry[0] |= 1 << rank
+                entry[1][rank] = card
+        suit_masks = {color: tuple(entry) for color, entry in suits.items()}
+        if ctx is not None:
+            ctx.suit_masks = suit_masks
+        return suit_masks
+    
+    def _context(self, hand: List[Card]) -> Optional[_HandContext]:
+        """The per-turn context if hand is the hand being decided on"""
+        ctx = self._ctx
+        if ctx is not None and hand is ctx.hand:
+            return ctx
+        return None
+    
+    def _hand_view(self, hand: List[Card]) -> _HandContext:
+        """The per-turn context if hand is the hand being decided on, else a throwaway one"""
+        ctx = self._context(hand)
+        if ctx is not None:
+            return ctx
+        return _HandContext(hand, self.level)
+    
+    def _get_values(self, hand: List[Card]) -> List[int]:
+        """Card values parallel to hand (cached for the current hand)"""
+        ctx = self._context(hand)
+        if ctx is not None:
+            return ctx.values
+        level = self.level
+        return [card.get_value(level) for card in hand]
+    
+    def _v(self, card: Card) -> int:
+        """Value of a single card, read from the card's own get_value cache"""
+        return card.get_value(self.level)
+    
+    def _get_index(self, hand: List[Card]) -> tuple:
+        """
+        Rank-count index of hand (cached for the current hand)
+        
+        Returns:
+            (counts, buckets): counts[slot] is the number of cards in each slot,
+            buckets[slot] holds those cards in hand order
+        """
+        return self._hand_view(hand).index
+    
+    def _split_jokers(self, hand: List[Card]) -> tuple:
+        """
+        Split hand into non-jokers and jokers, keeping hand order (cached for
+        the current hand)
+        
+        Returns:
+            (non_jokers, jokers): non_jokers holds (card, straight_rank) pairs
+        """
+        return self._hand_view(hand).split
+    
+    def _slots_in_hand_order(self, hand: List[Card]) -> List[int]:
+        """Index slots present in hand, ordered by where their value first appears"""
+        return list(dict.fromkeys([VALUE_TO_SLOT.get(value, value)
+                                   for value in self._get_values(hand)]))
     
     def _group_by_value(self, hand: List[Card]) -> dict:
         """Group cards by their value"""
-        groups = {}
-        for card in hand:
-            value = card.get_value(self.level)
-            if value not in groups:
-                groups[value] = []
-            groups[value].append(card)
-        return groups
-    
-    def _is_consecutive_list(self, values: List[int]) -> bool:
-        """Check if a list of values is consecutive"""
-        if len(values) < 2:
-            return False
-        for i in range(1, len(values)):
-            if values[i] != values[i-1] + 1:
-                return False
-        return True
-    
-    def _generate_combo_from_values(self, values: List[int], value_cards: dict, 
-                                    cards_per_value: int) -> List[List[Card]]:
-        """Generate all combinations taking cards_per_value cards from each value"""
-        if not values:
-            return [[]]
-        
-        result = []
-        first_value = values[0]
-        remaining_values = values[1:]
-        
-        for combo in combinations(value_cards[first_value], cards_per_value):
-            for rest in self._generate_combo_from_values(remaining_values, value_cards, cards_per_value):
-                result.append(list(combo) + rest)
-        
-        return result
+        counts, buckets = self._get_index(hand)
+        return {SLOT_VALUES[slot]: buckets[slot]
+                for slot in range(INDEX_SLOTS) if counts[slot]}
+    
+    def _generate_combo_from_values(self, hand: List[Card], values: List[int], 
+                                    value_cards: List[List[Card]], cards_per_value: int,
+                                    by_suit: bool = False) -> Iterator[List[Card]]:
+        """
+        Yield the combinations taking cards_per_value cards from each value,
+        one per card class (and suit when by_suit) mix, see _distinct_combos
+        """
+        if cards_per_value == 1:
+            # Plain straights: the buckets themselves are the choices
+            per_value = [self._distinct_cards(hand, value_cards[v], by_suit) for v in values]
+            for combo in product(*per_value):
+                yield list(combo)
+            return
+        # Pair/triple picks from a bomb rank all break that bomb, so one
+        # representative suffices (see _bucket_combos). Rank 14 mixes aces
+        # with level cards, so its size says nothing about bombs
+        per_value = [list(self._bucket_combos(hand, value_cards[v], cards_per_value)) if v < 14
+                     else list(self._distinct_combos(
+                         hand, combinations(value_cards[v], cards_per_value)))
+                     for v in values]
+        for combo in product(*per_value):
+            yield list(chain.from_iterable(combo))
     
     def _analyze_hand_patterns(self, hand: List[Card]) -> List[tuple]:
         """
         Analyze hand to find all complete patterns
-        Returns list of (pattern_type, cards, cost) tuples
+        Returns list of (pattern_type, cards, cost) tuples (memoized per
+        context; hands outside any context go through the shared cache)
         """
+        ctx = self._context(hand)
+        if ctx is not None:
+            if ctx.patterns is None:
+                ctx.patterns = self._scan_hand_patterns(hand)
+            return ctx.patterns
+        return self._lookup_hand_patterns(hand)
+    
+    def _lookup_hand_patterns(self, hand: List[Card], 
+                              hand_key: Optional[tuple] = None) -> List[tuple]:
+        """
+        _scan_hand_patterns through the shared analysis cache
+        
+        Entries are keyed on the level, the pattern costs and the hand in
+        order (pass hand_key if the caller already built it). A hit on other
+        Card objects maps the stored cards to this hand's by position; the
+        result is shared, so callers must not modify it
+        """
+        if not self.enable_caching:
+            return self._scan_hand_patterns(hand)
+        
+        if hand_key is None:
+            hand_key = _hand_key(hand)
+        key = (self.level, self._pattern_config, hand_key)
+        cache = self._hand_patterns
+        entry = cache.get(key)
+        if entry is not None:
+            cache.move_to_end(key)
+            scanned, patterns = entry
+            if all(map(is_, scanned, hand)):
+                return patterns
+            # Equal cards at the same positions, but other objects
+            card_at = {id(old): new for old, new in zip(scanned, hand)}
+            return [(pattern_type, [card_at[id(card)] for card in cards], cost)
+                    for pattern_type, cards, cost in patterns]
+        
+        patterns = self._scan_hand_patterns(hand)
+        cache[key] = (tuple(hand), patterns)
+        if len(cache) > self.HAND_PATTERN_CACHE_SIZE:
+            cache.popitem(last=False)
+        return patterns
+    
+    def _scan_hand_patterns(self, hand: List[Card]) -> List[tuple]:
+        """Uncached _analyze_hand_patterns"""
         patterns = []
-        value_groups = self._group_by_value(hand)
+        counts, buckets = self._get_index(hand)
         
         # Find bombs (4+ same cards)
-        for value, cards in value_groups.items():
-            if len(cards) >= 4:
-                if len(cards) >= 6:
+        for count, cards in zip(counts, buckets):
+            if count >= 4:
+                if count >= 6:
                     patterns.append(('BOMB_6PLUS', cards, self.COST_BOMB_6PLUS))
-                elif len(cards) == 5:
+                elif count == 5:
                     patterns.append(('BOMB_5', cards, self.COST_BOMB_5))
-                else:  # len(cards) == 4
+                else:  # count == 4
                     patterns.append(('BOMB_4', cards, self.COST_BOMB_4))
         
         # Find king bomb (4 jokers)
-        jokers = [c for c in hand if c.is_joker()]
+        jokers = self._split_jokers(hand)[1]
         if len(jokers) == 4:
             patterns.append(('KING_BOMB', jokers, self.COST_KING_BOMB))
         
@@ -412,198 +826,204 @@ class ImprovedGuandanAI(BaseStrategy):
         for fh_cards in fullhouses:
             patterns.append(('FULLHOUSE', fh_cards, self.COST_FULLHOUSE))
         
-        # Find triples
-        for value, cards in value_groups.items():
-            if len(cards) >= 3 and len(cards) < 4:  # Not a bomb
-                patterns.append(('TRIPLE', cards[:3], self.COST_TRIPLE))
+        # Find triples (exactly 3 cards, so the bucket is the triple)
+        for count, cards in zip(counts, buckets):
+            if count == 3:  # Not a bomb
+                patterns.append(('TRIPLE', cards, self.COST_TRIPLE))
         
-        # Find pairs
-        for value, cards in value_groups.items():
-            if len(cards) >= 2 and len(cards) < 4:  # Not a bomb
+        # Find pairs (slice only a triple's bucket)
+        for count, cards in zip(counts, buckets):
+            if count == 2:
+                patterns.append(('PAIR', cards, self.COST_PAIR))
+            elif count == 3:  # Not a bomb
                 patterns.append(('PAIR', cards[:2], self.COST_PAIR))
         
         return patterns
     
     def _find_straight_flushes_cards(self, hand: List[Card]) -> List[List[Card]]:
         """Find all straight flush card combinations in hand"""
-        results = []
-        suit_cards = {}
-        for card in hand:
-            if not card.is_joker():
-                if card.color not in suit_cards:
-                    suit_cards[card.color] = []
-                suit_cards[card.color].append(card)
-        
-        for color, cards in suit_cards.items():
-            if len(cards) >= 5:
-                value_cards = {}
-                for card in cards:
-                    val = card.get_value(self.level)
-                    if val >= 50:
-                        val = 14
-                    if val not in value_cards:
-                        value_cards[val] = []
-                    value_cards[val].append(card)
-                
-                sorted_values = sorted(value_cards.keys())
-                for length in range(5, len(sorted_values) + 1):
-                    for start_idx in range(len(sorted_values) - length + 1):
-                        values = sorted_values[start_idx:start_idx + length]
-                        if self._is_consecutive_list(values):
-                            combo = [value_cards[v][0] for v in values]
-                            results.append(combo)
-        return results
+        return [cards for cards, _ in self._straight_flush_runs(hand)]
     
     def _find_triple_straights_cards(self, hand: List[Card]) -> List[List[Card]]:
         """Find all triple straight (钢板) card combinations in hand"""
-        results = []
-        valid_cards = [c for c in hand if not c.is_joker()]
-        value_cards = {}
-        for card in valid_cards:
-            val = card.get_value(self.level)
-            if val >= 50:
-                val = 14
-            if val not in value_cards:
-                value_cards[val] = []
-            value_cards[val].append(card)
-        
-        valid_values = [v for v, cards in value_cards.items() if len(cards) >= 3]
-        valid_values.sort()
-        
-        for num_triples in range(2, len(valid_values) + 1):
-            for start_idx in range(len(valid_values) - num_triples + 1):
-                values = valid_values[start_idx:start_idx + num_triples]
-                if self._is_consecutive_list(values):
-                    combo = []
-                    for v in values:
-                        combo.extend(value_cards[v][:3])
-                    results.append(combo)
-        return results
+        return self._runs_to_cards(self._find_runs(hand, 3, 2), 3)
     
     def _find_pair_straights_cards(self, hand: List[Card]) -> List[List[Card]]:
         """Find all pair straight (连对) card combinations in hand"""
-        results = []
-        valid_cards = [c for c in hand if not c.is_joker()]
-        value_cards = {}
-        for card in valid_cards:
-            val = card.get_value(self.level)
-            if val >= 50:
-                val = 14
-            if val not in value_cards:
-                value_cards[val] = []
-            value_cards[val].append(card)
-        
-        valid_values = [v for v, cards in value_cards.items() if len(cards) >= 2]
-        valid_values.sort()
-        
-        for num_pairs in range(3, len(valid_values) + 1):
-            for start_idx in range(len(valid_values) - num_pairs + 1):
-                values = valid_values[start_idx:start_idx + num_pairs]
-                if self._is_consecutive_list(values):
-                    combo = []
-                    for v in values:
-                        combo.extend(value_cards[v][:2])
-                    results.append(combo)
-        return results
-    
-    def _find_straights_cards(self, hand: List[Card]) -> List[List[Card]]:
-        """Find all straight card combinations in hand"""
-        results = []
-        valid_cards = [c for c in hand if not c.is_joker()]
-        value_cards = {}
-        for card in valid_cards:
-            val = card.get_value(self.level)
-            if val >= 50:
-                val = 14
-            if val not in value_cards:
-                value_cards[val] = []
-            value_cards[val].append(card)
-        
-        sorted_values = sorted(value_cards.keys())
-        for length in range(5, len(sorted_values) + 1):
-            for start_idx in range(len(sorted_values) - length + 1):
-                values = sorted_values[start_idx:start_idx + length]
-                if self._is_consecutive_list(values):
-                    combo = [value_cards[v][0] for v in values]
-                    results.append(combo)
-        return results
+        return self._runs_to_cards(self._find_runs(hand, 2, 3), 2)
+    
+    def _find_straights_cards(self, hand: List[Card], length: int = 0) -> List[List[Card]]:
+        """
+        Find straight card combinations in hand
+        
+        With no length, only maximal runs are returned: a play breaks some
+        window of a run exactly when it breaks the whole run, so shorter
+        windows add nothing to cost analysis. With a length, every window of
+        exactly that length is returned.
+        """
+        return self._runs_to_cards(self._find_straight_runs(hand, length), 1)
+    
+    def _find_straight_runs(self, hand: List[Card], length: int = 0) -> tuple:
+        """_find_straights_cards as (value_cards, runs), see _find_runs"""
+        value_cards = self._straight_buckets(hand)
+        
+        mask = self._straight_mask(hand, value_cards, 1)
+        if length:
+            runs = [(start, length) for start in straight_windows(mask, length)]
+        else:
+            runs = maximal_runs(mask, 5)
+        return value_cards, runs
+    
+    def _find_runs(self, hand: List[Card], cards_per_value: int, min_run: int) -> tuple:
+        """
+        Every run of min_run+ consecutive ranks holding cards_per_value cards each
+        
+        Returns:
+            (value_cards, runs): the straight buckets and (start, length) rank runs
+        """
+        value_cards = self._straight_buckets(hand)
+        runs = consecutive_runs(self._straight_mask(hand, value_cards, cards_per_value), min_run)
+        return value_cards, runs
+    
+    def _runs_to_cards(self, found: tuple, cards_per_value: int) -> List[List[Card]]:
+        """Materialize (start, length) rank runs with the first cards_per_value cards of each rank"""
+        value_cards, runs = found
+        return [[card for v in range(start, start + length)
+                 for card in value_cards[v][:cards_per_value]]
+                for start, length in runs]
+    
+    def _smallest_run_cards(self, found: tuple, 
+                            cards_per_value: int) -> Optional[List[Card]]:
+        """
+        The run with the smallest total card value, materialized (the first
+        one on ties, like min over _runs_to_cards)
+        
+        Each rank's share of the total is summed once and runs add up those
+        rank sums, instead of summing every candidate card by card
+        """
+        value_cards, runs = found
+        if not runs:
+            return None
+        v = self._v
+        rank_totals = [sum(map(v, cards[:cards_per_value])) for cards in value_cards]
+        totals = [sum(rank_totals[start:start + length]) for start, length in runs]
+        best = runs[totals.index(min(totals))]
+        return self._runs_to_cards((value_cards, [best]), cards_per_value)[0]
     
     def _find_fullhouses_cards(self, hand: List[Card]) -> List[List[Card]]:
         """Find all fullhouse (三带二) card combinations in hand"""
-        results = []
-        value_groups = self._group_by_value(hand)
+        triples, pairs = self._fullhouse_parts(hand)
         
-        # Find triples and pairs
+        # Combine each triple with each pair (different values)
+        return [triple + pair
+                for t_value, triple in triples
+                for p_value, pair in pairs
+                if t_value != p_value]
+    
+    def _fullhouse_parts(self, hand: List[Card]) -> tuple:
+        """
+        The triples and pairs a fullhouse can use, in the order their values
+        first show up in hand (ties between equal totals go to the first)
+        
+        Returns:
+            (triples, pairs): lists of (value, cards)
+        """
+        counts, buckets = self._get_index(hand)
         triples = []
         pairs = []
-        for value, cards in value_groups.items():
-            if len(cards) >= 3:
+        for slot in self._slots_in_hand_order(hand):
+            value, count, cards = SLOT_VALUES[slot], counts[slot], buckets[slot]
+            if count >= 3:
                 triples.append((value, cards[:3]))
-            if len(cards) >= 2 and len(cards) < 4:  # Don't use bombs as pairs
+            if count in (2, 3):  # Don't use bombs as pairs
                 pairs.append((value, cards[:2]))
+        return triples, pairs
+    
+    def _existing_pattern_sets(self, hand: List[Card]) -> tuple:
+        """
+        Analyze hand once for cost calculation
         
-        # Combine each triple with each pair (different values)
-        for t_value, triple in triples:
-            for p_value, pair in pairs:
-                if t_value != p_value:
-                    results.append(triple + pair)
+        Each card of the hand gets one bit (keyed by id: two decks hold equal
+        cards that are still different physical cards)
         
-        return results
+        Returns:
+            (card_bits, patterns, card_classes, union_mask): the id -> bit map,
+            a list of (card_mask, cost) tuples for the existing patterns, most
+            valuable first, the card classes (see _card_classes) and the mask
+            of every card in some pattern, memoized per context
+        """
+        ctx = self._context(hand)
+        if ctx is not None and ctx.pattern_sets is not None:
+            return ctx.pattern_sets
+        
+        card_bits = {id(card): 1 << i for i, card in enumerate(hand)}
+        card_classes = dict.fromkeys(card_bits, 0)
+        union_mask = 0
+        patterns = []
+        for i, (_, pattern_cards, cost) in enumerate(self._analyze_hand_patterns(hand)):
+            pattern_bit = 1 << i
+            mask = 0
+            for card in pattern_cards:
+                card_id = id(card)
+                mask |= card_bits[card_id]
+                card_classes[card_id] |= pattern_bit
+            patterns.append((mask, cost))
+            union_mask |= mask
+        patterns.sort(key=itemgetter(1), reverse=True)
+        existing = (card_bits, patterns, card_classes, union_mask)
+        if ctx is not None:
+            ctx.pattern_sets = existing
+        return existing
     
-    def _calculate_play_cost(self, play: Pattern, hand: List[Card]) -> int:
+    def _calculate_play_cost(self, play: Pattern, existing_patterns: List[tuple]) -> int:
         """
         Calculate the cost of making a play
         Cost is based on whether the play breaks existing valuable patterns
+        
+        Args:
+            play: The candidate play
+            existing_patterns: Result of _existing_pattern_sets(hand)
         """
         # If play uses complete pattern (like using a bomb to beat another bomb), cost is 0
         if is_bomb_type(play):
             return 0  # Using a bomb as intended, no breakage cost
         
-        # Analyze existing patterns in hand
-        existing_patterns = self._analyze_hand_patterns(hand)
-        
         # Check which patterns would be broken by this play
-        play_cards_set = set(play.cards)
-        total_cost = 0
+        card_bits, patterns, _, union_mask = existing_patterns
+        play_mask = 0
+        for card in play.cards:
+            play_mask |= card_bits.get(id(card), 0)
+        if not play_mask & union_mask:
+            return 0  # Only cards outside every pattern
         
-        for pattern_type, pattern_cards, cost in existing_patterns:
-            pattern_cards_set = set(pattern_cards)
-            
+        # Patterns are sorted by descending cost, so the first break is the max
+        for pattern_mask, cost in patterns:
             # Check if this play would break this pattern
             # A pattern is broken if some but not all of its cards are used
-            overlap = play_cards_set & pattern_cards_set
-            if overlap and overlap != pattern_cards_set:
-                # This play breaks an existing pattern
-                total_cost = max(total_cost, cost)
+            overlap = play_mask & pattern_mask
+            if overlap and overlap != pattern_mask:
+                return cost
         
-        return total_cost
+        return 0
     
-    def _get_pattern_priority(self, pattern: Pattern, hand: List[Card]) -> int:
+    def _get_pattern_priority(self, pattern: Pattern, pair_count: int, 
+                              single_count: int) -> int:
         """
         Get the priority of a pattern type (lower number = higher priority)
         Priority: STRAIGHT > TRIPLE_STRAIGHT > PAIR_STRAIGHT > FULLHOUSE > TRIPLE > PAIR/SINGLE
         For PAIR vs SINGLE: the one with more count in hand has lower priority (prefer to play it)
+        
+        Args:
+            pair_count: _count_pairs_in_hand(hand), computed once per selection
+            single_count: _count_singles_in_hand(hand)
         """
         pattern_type = pattern.pattern_type
         
         # Base priorities (lower = prefer to play)
-        priorities = {
-            PatternType.STRAIGHT: 1,
-            PatternType.TRIPLE_STRAIGHT: 2,
-            PatternType.PAIR_STRAIGHT: 3,
-            PatternType.FULLHOUSE: 4,
-            PatternType.TRIPLE: 5,
-            PatternType.PAIR: 6,
-            PatternType.SINGLE: 6,
-        }
-        
-        base_priority = priorities.get(pattern_type, 10)
+        base_priority = PATTERN_PRIORITY.get(pattern_type, 10)
         
         # For PAIR vs SINGLE, dynamically adjust based on count
-        if pattern_type in [PatternType.PAIR, PatternType.SINGLE]:
-            pair_count = self._count_pairs_in_hand(hand)
-            single_count = self._count_singles_in_hand(hand)
-            
+        if pattern_type in (PatternType.PAIR, PatternType.SINGLE):
             if pattern_type == PatternType.PAIR:
                 # If more pairs than singles, prefer to play pairs (lower priority number)
                 if pair_count >= single_count:
@@ -621,25 +1041,16 @@ class ImprovedGuandanAI(BaseStrategy):
     
     def _count_pairs_in_hand(self, hand: List[Card]) -> int:
         """Count the number of pairs in hand (cards with exactly 2 of same value)"""
-        value_groups = self._group_by_value(hand)
-        count = 0
-        for value, cards in value_groups.items():
-            if len(cards) >= 2:
-                count += len(cards) // 2
-        return count
+        counts, _ = self._get_index(hand)
+        return sum(count // 2 for count in counts)
     
     def _count_singles_in_hand(self, hand: List[Card]) -> int:
         """Count the number of single cards in hand (cards with only 1 of same value)"""
-        value_groups = self._group_by_value(hand)
-        count = 0
-        for value, cards in value_groups.items():
-            if len(cards) == 1:
-                count += 1
-            elif len(cards) >= 2:
-                count += len(cards) % 2  # Remaining singles after pairing
-        return count
+        counts, _ = self._get_index(hand)
+        # Remaining singles after pairing
+        return sum(count % 2 for count in counts)
     
-    def _select_smallest_play(self, valid_plays: List[Pattern], hand: List[Card]) -> List[Card]:
+    def _select_smallest_play(self, valid_plays: Iterable[Pattern], hand: List[Card]) -> List[Card]:
         """
         Select the best play considering cost, pattern priority, and value
         Will pass if the cost of playing is too high
@@ -648,34 +1059,68 @@ class ImprovedGuandanAI(BaseStrategy):
         1. Pattern type: STRAIGHT > TRIPLE_STRAIGHT > PAIR_STRAIGHT > FULLHOUSE > TRIPLE > PAIR/SINGLE
         2. For PAIR vs SINGLE: prefer the one with more count in hand
         3. Main value (lower is better)
-        """
-        if not valid_plays:
-            return []
         
-        # Calculate cost and priority for each valid play
-        plays_with_info = []
+        valid_plays must be ordered as _find_all_beating_plays yields them
+        (same-type plays in ascending main value, then bombs in ascending bomb
+        rank): the first free non-bomb play and the first bomb are then
+        optimal and end the search.
+        """
+        if not self.config["enable_cost_scoring"]:
+            # Without cost scoring the stream order decides: the lowest
+            # same-type play, else the lowest bomb
+            first = next(iter(valid_plays), None)
+            return first.cards if first else []
+        
+        if self.PASS_COST >= self.COST_MAX:
+            # Cost can never force a pass, so a lone candidate needs no scoring
+            plays = iter(valid_plays)
+            first = next(plays, None)
+            if first is None:
+                return []
+            second = next(plays, None)
+            if second is None:
+                return first.cards
+            valid_plays = chain((first, second), plays)
+        
+        # Single pass keeping the best non-bomb and the best bomb
+        # Non-bombs are ranked by: cost, then priority, then main_value
+        # Bombs always cost 0 (see _calculate_play_cost), so rank by bomb rank
+        existing_patterns = None
+        hand_counts = None  # (pair_count, single_count) for the priority
+        best_non_bomb = None
+        best_bomb = None
         for play in valid_plays:
-            cost = self._calculate_play_cost(play, hand)
-            priority = self._get_pattern_priority(play, hand)
-            plays_with_info.append((play, cost, priority))
-        
-        # Separate bombs and non-bombs
-        non_bombs = [(p, c, pr) for p, c, pr in plays_with_info if not is_bomb_type(p)]
-        bombs = [(p, c, pr) for p, c, pr in plays_with_info if is_bomb_type(p)]
+            if is_bomb_type(play):
+                # Every non-bomb came before, and later bombs rank no lower
+                best_bomb = play
+                break
+            if existing_patterns is None:
+                existing_patterns = self._existing_pattern_sets(hand)
+            cost = self._calculate_play_cost(play, existing_patterns)
+            if best_non_bomb is not None and cost >= best_non_bomb[0][0]:
+                # Same-type plays share one priority and arrive in ascending
+                # main value: only a strictly cheaper one can win
+                continue
+            if hand_counts is None:
+                hand_counts = (self._count_pairs_in_hand(hand), 
+                               self._count_singles_in_hand(hand))
+            key = (cost, self._get_pattern_priority(play, *hand_counts), play.main_value)
+            if best_non_bomb is None or key < best_non_bomb[0]:
+                best_non_bomb = (key, play)
+                if cost == 0:
+                    # A bomb never replaces a free non-bomb: nothing later
+                    # can do better
+                    break
         
         best_play = None
         best_cost = float('inf')
         
-        if non_bombs:
-            # Sort non-bombs by: cost, then priority, then main_value
-            non_bombs.sort(key=lambda x: (x[1], x[2], x[0].main_value))
-            best_play, best_cost, _ = non_bombs[0]
+        if best_non_bomb:
+            best_cost, best_play = best_non_bomb[0][0], best_non_bomb[1]
         
-        if bombs:
-            # Sort bombs by: cost, then bomb rank
-            bombs.sort(key=lambda x: (x[1], get_bomb_rank(x[0])))
-            if not best_play or bombs[0][1] < best_cost:
-                best_play, best_cost, _ = bombs[0]
+        if best_bomb:
+            if not best_play or 0 < best_cost:
+                best_cost, best_play = 0, best_bomb
         
         # If the best play's cost exceeds PASS_COST, choose to pass
         if best_cost > self.PASS_COST:
@@ -744,66 +1189,52 @@ class ImprovedGuandanAI(BaseStrategy):
     
     def _try_play_straight(self, hand: List[Card]) -> Optional[List[Card]]:
         """尝试出顺子（最小的）"""
-        straights = self._find_straights_cards(hand)
-        if straights:
-            # 选择最小的顺子
-            best_straight = min(straights, key=lambda s: self._calculate_cards_total_value(s))
-            return best_straight
-        return None
+        # 选择总点数最小的顺子
+        return self._smallest_run_cards(self._find_straight_runs(hand, 5), 1)
     
     def _try_play_pair_straight(self, hand: List[Card]) -> Optional[List[Card]]:
         """尝试出连对（最小的）"""
-        pair_straights = self._find_pair_straights_cards(hand)
-        if pair_straights:
-            # 选择最小的连对
-            best_ps = min(pair_straights, key=lambda ps: self._calculate_cards_total_value(ps))
-            return best_ps
-        return None
+        # 选择总点数最小的连对
+        return self._smallest_run_cards(self._find_runs(hand, 2, 3), 2)
     
     def _try_play_triple_straight(self, hand: List[Card]) -> Optional[List[Card]]:
         """尝试出钢板（最小的）"""
-        triple_straights = self._find_triple_straights_cards(hand)
-        if triple_straights:
-            # 选择最小的钢板
-            best_ts = min(triple_straights, key=lambda ts: self._calculate_cards_total_value(ts))
-            return best_ts
-        return None
+        # 选择总点数最小的钢板
+        return self._smallest_run_cards(self._find_runs(hand, 3, 2), 3)
     
     def _try_play_fullhouse(self, hand: List[Card]) -> Optional[List[Card]]:
         """尝试出三带二（最小的）"""
-        fullhouses = self._find_fullhouses_cards(hand)
-        if fullhouses:
-            # 选择最小的三带二
-            best_fh = min(fullhouses, key=lambda fh: self._calculate_cards_total_value(fh))
-            return best_fh
-        return None
+        triples, pairs = self._fullhouse_parts(hand)
+        # 同一点数的牌点数相同，总点数即 3*三张点数 + 2*对子点数；
+        # 按 _find_fullhouses_cards 的顺序比较，相同时取第一个
+        best = None
+        best_total = 0
+        for t_value, triple in triples:
+            for p_value, pair in pairs:
+                if t_value != p_value:
+                    total = 3 * t_value + 2 * p_value
+                    if best is None or total < best_total:
+                        best = (triple, pair)
+                        best_total = total
+        # 选择总点数最小的三带二
+        return best[0] + best[1] if best else None
     
     def _try_play_triple(self, hand: List[Card]) -> Optional[List[Card]]:
         """尝试出三张（最小的）"""
-        value_groups = self._group_by_value(hand)
-        triples = []
-        for value, cards in value_groups.items():
-            if len(cards) >= 3 and len(cards) < 4:  # 不是炸弹
-                triples.append((value, cards[:3]))
-        
-        if triples:
-            # 选择最小的三张
-            triples.sort(key=lambda t: t[0])
-            return triples[0][1]
+        counts, buckets = self._get_index(hand)
+        # 按点数从小到大扫描，第一个即最小的三张
+        for count, cards in zip(counts, buckets):
+            if count == 3:  # 不是炸弹
+                return cards[:]  # 返回副本，索引中的列表不外传
         return None
     
     def _try_play_pair(self, hand: List[Card]) -> Optional[List[Card]]:
         """尝试出对子（最小的）"""
-        value_groups = self._group_by_value(hand)
-        pairs = []
-        for value, cards in value_groups.items():
-            if len(cards) >= 2 and len(cards) < 4:  # 不是炸弹
-                pairs.append((value, cards[:2]))
-        
-        if pairs:
-            # 选择最小的对子
-            pairs.sort(key=lambda p: p[0])
-            return pairs[0][1]
+        counts, buckets = self._get_index(hand)
+        # 按点数从小到大扫描，第一个即最小的对子
+        for count, cards in zip(counts, buckets):
+            if count in (2, 3):  # 不是炸弹
+                return cards[:2]
         return None
     
     def _play_smallest_isolated_single(self, hand: List[Card]) -> List[Card]:
@@ -811,26 +1242,20 @@ class ImprovedGuandanAI(BaseStrategy):
         出最小的孤立单牌
         孤立牌定义：该点数的牌数量<=阈值（默认2）
         """
-        value_groups = self._group_by_value(hand)
-        threshold = self.config["thresholds"]["isolated_card_threshold"]
-        
-        # 找出所有孤立牌
-        isolated_cards = []
-        for value, cards in value_groups.items():
-            if len(cards) <= threshold:
-                isolated_cards.extend(cards)
+        counts, buckets = self._get_index(hand)
+        threshold = self.ISOLATED_THRESHOLD
         
-        if isolated_cards:
-            # 返回最小的孤立牌
-            sorted_isolated = sorted(isolated_cards, key=lambda c: c.get_value(self.level))
-            return [sorted_isolated[0]]
+        # 按点数从小到大扫描，第一个孤立点数即最小的孤立牌
+        for slot in range(INDEX_SLOTS):
+            if 0 < counts[slot] <= threshold:
+                return [buckets[slot][0]]
         
         # 如果没有孤立牌，返回最小的单牌
         return self._play_smallest_single(hand)
     
     def _calculate_cards_total_value(self, cards: List[Card]) -> int:
         """计算一组牌的总价值（用于比较大小）"""
-        return sum(c.get_value(self.level) for c in cards)
+        return sum(map(self._v, cards))
     
     # ==================== 方案A新增功能：手牌质量评估 ====================
     
@@ -847,41 +1272,71 @@ class ImprovedGuandanAI(BaseStrategy):
         if not hand:
             return 100.0  # 没牌了，完美！
         
-        weights = self.config["quality_weights"]
+        ctx = self._context(hand)
+        if ctx is not None:
+            # 出牌前的质量对每个候选出牌都相同，每个上下文只评一次
+            if ctx.quality is None:
+                ctx.quality = self._score_hand_quality(hand)
+            return ctx.quality
+        
+        # 非当前手牌（如模拟出牌后的剩余手牌）：同一手牌常被反复评分，先查质量缓存。
+        # 花色和顺序会影响牌型分析，所以按完整手牌（而非点数统计）做键
+        key = hand_key = None
+        if self.enable_caching:
+            hand_key = _hand_key(hand)
+            key = (self.level, self._quality_config, hand_key)
+            cache = self._hand_qualities
+            quality = cache.get(key)
+            if quality is not None:
+                cache.move_to_end(key)
+                return quality
+        
+        # 评分期间临时建立一次索引，供牌型分析、孤立牌统计和步数估算共用
+        outer = self._ctx
+        self._ctx = _HandContext(hand, self.level)
+        self._ctx.patterns = self._lookup_hand_patterns(hand, hand_key)
+        try:
+            quality = self._score_hand_quality(hand)
+        finally:
+            self._ctx = outer
+        
+        if key is not None:
+            cache[key] = quality
+            if len(cache) > self.HAND_QUALITY_CACHE_SIZE:
+                cache.popitem(last=False)
+        return quality
+    
+    def _score_hand_quality(self, hand: List[Card]) -> float:
+        """_evaluate_hand_quality 的实现，hand 的上下文已建立"""
+        completeness_weight = self.QW_COMPLETENESS
         score = 0.0
         
         # 1. 牌型完整度（40分）
         patterns = self._analyze_hand_patterns(hand)
-        complete_patterns = [p for p in patterns if p[0] not in ['PAIR', 'TRIPLE']]
+        complete_patterns = [p for p in patterns if p[0] not in PARTIAL_PATTERNS]
         completeness = len(complete_patterns) / max(1, len(hand) / 5)
-        score += min(weights["completeness"], completeness * weights["completeness"])
+        score += min(completeness_weight, completeness * completeness_weight)
         
         # 2. 孤立牌惩罚
         isolated_count = self._count_isolated_cards(hand)
-        score -= isolated_count * weights["isolated_penalty"]
+        score -= isolated_count * self.QW_ISOLATED_PENALTY
         
         # 3. 炸弹奖励
         bombs = [p for p in patterns if 'BOMB' in p[0]]
-        score += len(bombs) * weights["bomb_bonus"]
+        score += len(bombs) * self.QW_BOMB_BONUS
         
         # 4. 出牌步数评估
         estimated_steps = self._estimate_steps_to_finish(hand)
-        steps_score = max(0, weights["completeness"] - estimated_steps * weights["steps_factor"])
+        steps_score = max(0, completeness_weight - estimated_steps * self.QW_STEPS_FACTOR)
         score += steps_score
         
         return max(0.0, min(100.0, score))
     
     def _count_isolated_cards(self, hand: List[Card]) -> int:
         """计算孤立牌数量（无法组成牌型的牌）"""
-        value_groups = self._group_by_value(hand)
-        threshold = self.config["thresholds"]["isolated_card_threshold"]
-        
-        isolated_count = 0
-        for value, cards in value_groups.items():
-            if len(cards) <= threshold:
-                isolated_count += len(cards)
-        
-        return isolated_count
+        counts, _ = self._get_index(hand)
+        threshold = self.ISOLATED_THRESHOLD
+        return sum(count for count in counts if count <= threshold)
     
     def _estimate_steps_to_finish(self, hand: List[Card]) -> int:
         """
@@ -893,10 +1348,10 @@ class ImprovedGuandanAI(BaseStrategy):
         # 统计完整牌型覆盖的牌数
         covered_cards = set()
         for pattern_type, cards, cost in patterns:
-            if pattern_type not in ['PAIR', 'TRIPLE']:  # 只计算大牌型
+            if pattern_type not in PARTIAL_PATTERNS:  # 只计算大牌型
                 covered_cards.update(cards)
         
-        complete_pattern_steps = len([p for p in patterns if p[0] not in ['PAIR', 'TRIPLE']])
+        complete_pattern_steps = sum(1 for p in patterns if p[0] not in PARTIAL_PATTERNS)
         remaining_cards = len(hand) - len(covered_cards)
         remaining_steps = (remaining_cards + 2) // 3  # 向上取整
         
@@ -912,15 +1367,13 @@ class ImprovedGuandanAI(BaseStrategy):
         """
         if not self.config["enable_hand_balance"]:
             # 如果未启用手牌平衡，使用原始成本计算
-            return self._calculate_play_cost(play, hand)
-        
-        weights = self.config["cost_weights"]
+            return self._calculate_play_cost(play, self._existing_pattern_sets(hand))
         
         # 1. 基础成本
         base_cost = self._get_base_cost(play)
         
         # 2. 破坏成本（原有逻辑）
-        break_cost = self._calculate_play_cost(play, hand)
+        break_cost = self._calculate_play_cost(play, self._existing_pattern_sets(hand))
         
         # 3. 手牌平衡成本（新增）
         balance_cost = self._calculate_balance_cost(play, hand)
@@ -929,29 +1382,17 @@ class ImprovedGuandanAI(BaseStrategy):
         stage_cost = self._calculate_stage_cost(play, hand)
         
         total_cost = (
-            base_cost * weights["base"] +
-            break_cost * weights["break"] +
-            balance_cost * weights["balance"] +
-            stage_cost * weights["stage"]
+            base_cost * self.CW_BASE +
+            break_cost * self.CW_BREAK +
+            balance_cost * self.CW_BALANCE +
+            stage_cost * self.CW_STAGE
         )
         
         return total_cost
     
     def _get_base_cost(self, play: Pattern) -> float:
-        """获取牌型的基础成本"""
-        if is_bomb_type(play):
-            return 0.0  # 炸弹作为正常出牌，成本为0
-        
-        # 根据牌型大小设置基础成本
-        pattern_type = play.pattern_type
-        if pattern_type == PatternType.SINGLE:
-            return 5.0  # 单牌有一定成本，避免过度出单牌
-        elif pattern_type == PatternType.PAIR:
-            return 3.0
-        elif pattern_type == PatternType.TRIPLE:
-            return 2.0
-        else:
-            return 1.0  # 大牌型成本低，鼓励出大牌型
+        """获取牌型的基础成本（按牌型查表，见 BASE_COST）"""
+        return BASE_COST.get(play.pattern_type, BASE_COST_DEFAULT)
     
     def _calculate_balance_cost(self, play: Pattern, hand: List[Card]) -> float:
         """
@@ -961,11 +1402,16 @@ class ImprovedGuandanAI(BaseStrategy):
         # 计算出牌前的手牌质量
         before_quality = self._evaluate_hand_quality(hand)
         
-        # 模拟出牌后的手牌
-        remaining = hand.copy()
-        for card in play.cards:
-            if card in remaining:
-                remaining.remove(card)
+        # 模拟出牌后的手牌：每张出牌去掉手牌中第一张相同的牌（同 list.remove），
+        # 用计数代替逐张 __eq__ 扫描；不在出牌中的牌用 get 查，避免 Counter.__missing__
+        to_remove = Counter([card._key for card in play.cards])
+        remaining = []
+        for card in hand:
+            key = card._key
+            if to_remove.get(key):
+                to_remove[key] -= 1
+            else:
+                remaining.append(card)
         
         # 计算出牌后的手牌质量
         after_quality = self._evaluate_hand_quality(remaining)
@@ -980,23 +1426,5 @@ class ImprovedGuandanAI(BaseStrategy):
         计算阶段成本
         根据游戏阶段（手牌数量）动态调整成本
         """
-        hand_size = len(hand)
-        
-        # 开局阶段（手牌多）：鼓励出大牌型
-        if hand_size > 15:
-            if play.pattern_type in [PatternType.STRAIGHT, PatternType.PAIR_STRAIGHT, 
-                                     PatternType.TRIPLE_STRAIGHT]:
-                return -5.0  # 负成本=奖励
-            elif play.pattern_type == PatternType.SINGLE:
-                return 10.0  # 惩罚出单牌
-        
-        # 中局阶段（手牌中等）：平衡策略
-        elif hand_size > 8:
-            if play.pattern_type == PatternType.SINGLE:
-                return 5.0
-        
-        # 残局阶段（手牌少）：快速出完
-        else:
-            return 0.0  # 残局不考虑阶段成本
-        
-        return 0.0
+        stage = bisect_left(STAGE_BOUNDS, len(hand))
+        return STAGE_COST.get((stage, play.pattern_type), 0.0)
@@ -17,6 +17,7 @@ class AIConfig:
         "enable_smart_first_move": True,      # 启用智能首次出牌
         "enable_hand_balance": True,          # 启用手牌平衡成本
         "enable_sequence_planning": False,    # 启用序列规划（可逐步启用）
+        "enable_cost_scoring": True,          # 跟牌时按破坏成本选牌（关闭则直接出最小的可压牌）
         
         # 成本权重
         "cost_weights": {
@@ -25,9 +25,18 @@ class Card:
         number: Card number (1=A, 2-10, 11=J, 12=Q, 13=K, 15=Black Joker, 16=Red Joker)
     """
     
+    # 每条消息都要解析整手牌：用 __slots__ 省去实例字典
+    __slots__ = ("color", "number", "_key", "_hash", "_value_level", "_value")
+    
     def __init__(self, color: str, number: int):
         self.color = color
         self.number = number
+        # (color, number) 及其哈希只算一次，供 __eq__/__hash__ 与手牌键复用
+        self._key = (color, number)
+        self._hash = hash(self._key)
+        # get_value 的单槽缓存：同一局级牌不变，只需按级牌记住上次结果
+        self._value_level = None
+        self._value = 0
     
     def __repr__(self):
         return f"Card({self.color}, {self.number})"
@@ -35,10 +44,10 @@ class Card:
     def __eq__(self, other):
         if not isinstance(other, Card):
             return False
-        return self.color == other.color and self.number == other.number
+        return self._key == other._key
     
     def __hash__(self):
-        return hash((self.color, self.number))
+        return self._hash
     
     def to_dict(self):
         """Convert card to dictionary format"""
@@ -59,6 +68,15 @@ class Card:
         Returns:
             Card value for comparison (higher is stronger)
         """
+        if level == self._value_level:
+            return self._value
+        value = self._compute_value(level)
+        self._value_level = level
+        self._value = value
+        return value
+    
+    def _compute_value(self, level: int) -> int:
+        """Uncached get_value"""
         # Jokers are always highest
         if self.number == 16:  # Red Joker
             return 100
@@ -91,9 +109,16 @@ class Card:
 
 def parse_cards(card_list: List[dict]) -> List[Card]:
     """Parse list of card dictionaries into Card objects"""
-    return [Card.from_dict(card_data) for card_data in card_list]
+    # Same as Card.from_dict per card, without the extra call
+    return [Card(card_data["color"], card_data["number"]) for card_data in card_list]
+
+
+def parse_cards_fast(pairs) -> List[Card]:
+    """Parse (color, number) tuples into Card objects (parse_cards without the dicts)"""
+    return [Card(color, number) for color, number in pairs]
 
 
 def cards_to_dict_list(cards: List[Card]) -> List[dict]:
     """Convert list of Card objects to dictionary list"""
-    return [card.to_dict() for card in cards]
+    # Same as card.to_dict() per card, without the extra call
+    return [{"color": card.color, "number": card.number} for card in cards]
@@ -7,6 +7,10 @@ from typing import List, Optional
 from game.pattern import Pattern, PatternType
 
 
+# Hashed set lookup instead of scanning a list on every check
+_BOMB_TYPES = frozenset((PatternType.BOMB, PatternType.STRAIGHT_FLUSH, PatternType.KING_BOMB))
+
+
 def get_bomb_rank(pattern: Pattern) -> int:
     """
     Get the rank of a bomb pattern for comparison
@@ -20,27 +24,19 @@ def get_bomb_rank(pattern: Pattern) -> int:
     - 8-card bomb
     - King bomb (highest)
     
+    Regular bombs rank as length * 100 + main_value, straight flushes as
+    550 + main_value, and the king bomb as 10000. The rank is computed once
+    when the Pattern is built.
+    
     Returns:
-        Integer rank for comparison
+        Integer rank for comparison (0 if not a bomb)
     """
-    if pattern.pattern_type == PatternType.KING_BOMB:
-        return 10000  # Highest
-    
-    if pattern.pattern_type == PatternType.STRAIGHT_FLUSH:
-        # Straight flush is between 5-card and 6-card bomb
-        # Value is 5.5 * 100 + main_value
-        return 550 + pattern.main_value
-    
-    if pattern.pattern_type == PatternType.BOMB:
-        # Regular bomb: length * 100 + main_value
-        return pattern.length * 100 + pattern.main_value
-    
-    return 0  # Not a bomb
+    return pattern.bomb_rank
 
 
 def is_bomb_type(pattern: Pattern) -> bool:
     """Check if a pattern is a bomb type"""
-    return pattern.pattern_type in [PatternType.BOMB, PatternType.STRAIGHT_FLUSH, PatternType.KING_BOMB]
+    return pattern.pattern_type in _BOMB_TYPES
 
 
 def can_beat(pattern1: Pattern, pattern2: Pattern) -> bool:
@@ -33,6 +33,18 @@ class Pattern:
         self.cards = cards
         self.main_value = main_value  # Main value for comparison
         self.length = length  # Length for straights, bombs, etc.
+        self.bomb_rank = self._bomb_rank()  # 0 for non-bombs
+    
+    def _bomb_rank(self) -> int:
+        """Rank among bombs, see comparator.get_bomb_rank"""
+        if self.pattern_type == PatternType.KING_BOMB:
+            return 10000  # Highest
+        if self.pattern_type == PatternType.STRAIGHT_FLUSH:
+            # Straight flush is between 5-card and 6-card bomb
+            return 550 + self.main_value
+        if self.pattern_type == PatternType.BOMB:
+            return self.length * 100 + self.main_value
+        return 0
     
     def __repr__(self):
         return f"Pattern({self.pattern_type.value}, cards={len(self.cards)}, value={self.main_value})"
@@ -54,7 +66,7 @@ def identify_pattern(cards: List[Card], level: int) -> Optional[Pattern]:
     
     n = len(cards)
     
-    # Get card values for comparison
+    # Get card values for comparison (sorted once, shared with check_straight)
     values = [card.get_value(level) for card in cards]
     values.sort()
     
@@ -62,8 +74,8 @@ def identify_pattern(cards: List[Card], level: int) -> Optional[Pattern]:
     counter = Counter(values)
     counts = sorted(counter.values(), reverse=True)
     
-    # KING_BOMB: 4 Jokers
-    if n == 4 and all(card.is_joker() for card in cards):
+    # KING_BOMB: 4 Jokers (values 99/100, so the smallest decides)
+    if n == 4 and values[0] >= 99:
         return Pattern(PatternType.KING_BOMB, cards, 1000, 4)
     
     # SINGLE
@@ -88,61 +100,70 @@ def identify_pattern(cards: List[Card], level: int) -> Optional[Pattern]:
         return Pattern(PatternType.FULLHOUSE, cards, triple_value, 1)
     
     # Check for straights
-    straight_result = check_straight(cards, level)
+    straight_result = check_straight(cards, level, values)
     if straight_result:
         return straight_result
     
     return None
 
 
-def check_straight(cards: List[Card], level: int) -> Optional[Pattern]:
-    """Check if cards form a straight pattern"""
+def check_straight(cards: List[Card], level: int, 
+                   values: Optional[List[int]] = None) -> Optional[Pattern]:
+    """
+    Check if cards form a straight pattern
+    
+    Args:
+        values: The cards' values already sorted ascending, if the caller has them
+    """
     n = len(cards)
+    if n < 5:
+        return None  # Every straight shape needs at least 5 cards
+    
+    if values is None:
+        values = sorted([card.get_value(level) for card in cards])
+    if values[-1] >= 99:
+        return None  # Jokers can't be in straights
     
     # Get normalized values (for straight checking, A=14, level cards need special handling)
-    normalized_values = []
-    for card in cards:
-        if card.is_joker():
-            return None  # Jokers can't be in straights
-        val = card.get_value(level)
-        if val >= 50:  # Level card
-            val = 14  # Treat as highest regular card for straight
-        elif val == 14:  # A
-            val = 14
-        normalized_values.append(val)
-    
-    normalized_values.sort()
-    counter = Counter(normalized_values)
+    # Level cards (50) are treated as the highest regular card; they sort last
+    # either way, so the list stays sorted
+    normalized_values = [14 if val >= 50 else val for val in values]
+    low = normalized_values[0]
+    high = normalized_values[-1]
+    
+    # Every straight shape repeats each of its ranks the same number of times
+    # (1, 2 or 3): with d distinct ranks that is n // d cards per rank
+    distinct = len(set(normalized_values))
+    per_rank, extra = divmod(n, distinct)
+    # Distinct ranks are consecutive iff they span distinct - 1 (see is_consecutive)
+    if extra or per_rank > 3 or high - low != distinct - 1:
+        return None
+    # Sorted, so the counts are all per_rank iff every block of per_rank
+    # values starts and ends on the same rank
+    if per_rank > 1 and normalized_values[::per_rank] != normalized_values[per_rank - 1::per_rank]:
+        return None
     
     # STRAIGHT: 5+ consecutive singles
-    if n >= 5 and all(c == 1 for c in counter.values()):
-        if is_consecutive(list(counter.keys())):
-            # Check if same suit (STRAIGHT_FLUSH)
-            colors = [card.color for card in cards]
-            if len(set(colors)) == 1 and colors[0] != "Joker":
-                # Straight flush: value between 5-bomb and 6-bomb
-                return Pattern(PatternType.STRAIGHT_FLUSH, cards, normalized_values[-1], n)
-            return Pattern(PatternType.STRAIGHT, cards, normalized_values[-1], n)
-    
-    # PAIR_STRAIGHT: 3+ consecutive pairs
-    if n >= 6 and n % 2 == 0 and all(c == 2 for c in counter.values()):
-        if is_consecutive(list(counter.keys())):
-            return Pattern(PatternType.PAIR_STRAIGHT, cards, normalized_values[-1], len(counter))
-    
-    # TRIPLE_STRAIGHT: 2+ consecutive triples
-    if n >= 6 and n % 3 == 0 and all(c == 3 for c in counter.values()):
-        if is_consecutive(list(counter.keys())):
-            return Pattern(PatternType.TRIPLE_STRAIGHT, cards, normalized_values[-1], len(counter))
-    
-    return None
+    if per_rank == 1:
+        # Check if same suit (STRAIGHT_FLUSH), stopping at the first other suit
+        color = cards[0].color
+        if color != "Joker" and all(card.color == color for card in cards):
+            # Straight flush: value between 5-bomb and 6-bomb
+            return Pattern(PatternType.STRAIGHT_FLUSH, cards, high, n)
+        return Pattern(PatternType.STRAIGHT, cards, high, n)
+    
+    # PAIR_STRAIGHT: 3+ consecutive pairs (n >= 5 and even, so n >= 6)
+    if per_rank == 2:
+        return Pattern(PatternType.PAIR_STRAIGHT, cards, high, distinct)
+    
+    # TRIPLE_STRAIGHT: 2+ consecutive triples (n >= 5, so n >= 6)
+    return Pattern(PatternType.TRIPLE_STRAIGHT, cards, high, distinct)
 
 
 def is_consecutive(values: List[int]) -> bool:
     """Check if values are consecutive"""
     if len(values) <= 1:
         return False
-    values = sorted(values)
-    for i in range(1, len(values)):
-        if values[i] != values[i-1] + 1:
-            return False
-    return True
+    # Distinct integers are consecutive iff they span exactly len(values) - 1
+    return (max(values) - min(values) == len(values) - 1
+            and len(set(values)) == len(values))
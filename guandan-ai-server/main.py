@@ -63,11 +63,15 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     logger.info("WebSocket connection established")
     
+    # One AI per connection, rebuilt only when the level changes
+    ai = None
+    ai_level = None
+    
     try:
         while True:
             # Receive message
             data = await websocket.receive_text()
-            logger.info(f"Received: {data}")
+            logger.debug("Received: %s", data)
             
             try:
                 message = json.loads(data)
@@ -89,10 +93,13 @@ async def websocket_endpoint(websocket: WebSocket):
                 last_move = parse_cards(last_move_data) if last_move_data else []
                 hand = parse_cards(your_cards_data)
                 
-                logger.info(f"Level: {level}, Last move: {len(last_move)} cards, Hand: {len(hand)} cards")
+                logger.debug("Level: %s, Last move: %d cards, Hand: %d cards",
+                             level, len(last_move), len(hand))
                 
-                # Create AI and find best play
-                ai = create_ai(level)
+                # Reuse the connection's AI and find best play
+                if ai is None or level != ai_level:
+                    ai = create_ai(level)
+                    ai_level = level
                 play = ai.find_best_play(hand, last_move)
                 
                 # Prepare response (empty cards list means pass)
@@ -105,7 +112,7 @@ async def websocket_endpoint(websocket: WebSocket):
                 if request_id is not None:
                     response["request_id"] = request_id
                 
-                logger.info(f"Response: {response}")
+                logger.debug("Response: %s", response)
                 await websocket.send_json(response)
                 
             except json.JSONDecodeError as e:
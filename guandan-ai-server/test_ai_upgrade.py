@@ -3,116 +3,116 @@
 对比原AI和新AI的出牌行为
 """
 
-from game.card import Card, parse_cards
+from functools import lru_cache
+
+import pytest
+
+from game.card import Card, parse_cards_fast
 from ai import create_ai, AIConfig
+from ai.strategy import ImprovedGuandanAI
 
 
-def test_first_move_with_straight():
-    """测试场景1：手牌中有顺子，首次出牌应该优先出顺子"""
-    print("\n" + "="*60)
-    print("测试场景1：首次出牌 - 手牌中有顺子")
-    print("="*60)
-    
-    # 构造测试手牌：包含一个顺子 6-7-8-9-10
-    hand = parse_cards([
-        {"color": "♠", "number": 3},
-        {"color": "♥", "number": 3},
-        {"color": "♠", "number": 6},
-        {"color": "♠", "number": 7},
-        {"color": "♠", "number": 8},
-        {"color": "♠", "number": 9},
-        {"color": "♠", "number": 10},
-        {"color": "♥", "number": "J"},
-        {"color": "♦", "number": "Q"},
-    ])
-    
-    print(f"手牌：{[f'{c.color}{c.number}' for c in hand]}")
-    
-    # 测试新AI
-    AIConfig.ALGORITHM = "improved"
-    ai = create_ai(level=2)
-    play = ai.find_best_play(hand, [])
-    
-    print(f"\n新AI出牌：{[f'{c.color}{c.number}' for c in play]}")
-    print(f"出牌数量：{len(play)}")
-    
-    if len(play) == 5:
-        print("✅ 测试通过：AI出了顺子（5张牌）")
-    elif len(play) == 1:
-        print("❌ 测试失败：AI出了单牌")
-    else:
-        print(f"⚠️  AI出了{len(play)}张牌")
+@lru_cache(maxsize=None)
+def _get_ai(algorithm: str, level: int):
+    """按 (算法, 等级) 缓存AI实例，各测试共用，避免重复构造（不改全局算法配置）"""
+    return create_ai(level=level, algorithm=algorithm)
 
 
-def test_first_move_with_pairs():
-    """测试场景2：手牌中有多个对子，应该优先出对子而不是单牌"""
-    print("\n" + "="*60)
-    print("测试场景2：首次出牌 - 手牌中有多个对子")
-    print("="*60)
-    
-    # 构造测试手牌：包含3个对子
-    hand = parse_cards([
-        {"color": "♠", "number": 3},
-        {"color": "♥", "number": 3},
-        {"color": "♠", "number": 4},
-        {"color": "♥", "number": 4},
-        {"color": "♠", "number": 5},
-        {"color": "♥", "number": 5},
-        {"color": "♦", "number": 7},
-        {"color": "♣", "number": 9},
-    ])
-    
-    print(f"手牌：{[f'{c.color}{c.number}' for c in hand]}")
-    
-    # 测试新AI
-    AIConfig.ALGORITHM = "improved"
-    ai = create_ai(level=2)
-    play = ai.find_best_play(hand, [])
-    
-    print(f"\n新AI出牌：{[f'{c.color}{c.number}' for c in play]}")
-    print(f"出牌数量：{len(play)}")
-    
-    if len(play) == 2:
-        print("✅ 测试通过：AI出了对子（2张牌）")
-    elif len(play) == 1:
-        print("❌ 测试失败：AI出了单牌")
-    else:
-        print(f"⚠️  AI出了{len(play)}张牌")
+# 测试手牌在模块导入时解析一次，各测试直接复用（AI不会修改传入的手牌）
+# 包含一个顺子 6-7-8-9-10
+_HAND_STRAIGHT = parse_cards_fast([
+    ("♠", 3),
+    ("♥", 3),
+    ("♠", 6),
+    ("♠", 7),
+    ("♠", 8),
+    ("♠", 9),
+    ("♠", 10),
+    ("♥", 11),
+    ("♦", 12),
+])
+
+# 包含3个对子
+_HAND_PAIRS = parse_cards_fast([
+    ("♠", 3),
+    ("♥", 3),
+    ("♠", 4),
+    ("♥", 4),
+    ("♠", 5),
+    ("♥", 5),
+    ("♦", 7),
+    ("♣", 9),
+])
 
+# 包含三张5
+_HAND_TRIPLE = parse_cards_fast([
+    ("♠", 3),
+    ("♠", 5),
+    ("♥", 5),
+    ("♦", 5),
+    ("♠", 7),
+    ("♥", 9),
+    ("♦", 11),
+])
 
-def test_first_move_with_triple():
-    """测试场景3：手牌中有三张，应该优先出三张"""
+# 好手牌：有顺子和对子
+_HAND_GOOD = parse_cards_fast([
+    ("♠", 5),
+    ("♠", 6),
+    ("♠", 7),
+    ("♠", 8),
+    ("♠", 9),
+    ("♥", 10),
+    ("♦", 10),
+])
+
+# 差手牌：都是孤立牌
+_HAND_BAD = parse_cards_fast([
+    ("♠", 3),
+    ("♥", 5),
+    ("♦", 7),
+    ("♣", 9),
+    ("♠", 11),
+    ("♥", 13),
+    ("♦", 1),
+])
+
+# 包含孤立牌的手牌
+_HAND_ISOLATED = parse_cards_fast([
+    ("♠", 3),  # 孤立
+    ("♥", 5),
+    ("♦", 5),  # 对子（不超过阈值2张，也计为孤立）
+    ("♣", 7),  # 孤立
+    ("♠", 9),
+    ("♥", 9),
+    ("♦", 9),  # 三张，不孤立
+])
+
+
+@pytest.mark.parametrize("scenario, hand, expected, label", [
+    # 测试场景1：手牌中有顺子，首次出牌应该优先出顺子
+    (1, _HAND_STRAIGHT, 5, "顺子"),
+    # 测试场景2：手牌中有3个连续对子，应该作为连对整体出，而不是单牌
+    (2, _HAND_PAIRS, 6, "连对"),
+    # 测试场景3：手牌中有三张，应该优先出三张
+    (3, _HAND_TRIPLE, 3, "三张"),
+])
+def test_first_move(scenario, hand, expected, label):
+    """测试场景1-3：首次出牌应优先出完整牌型，而不是单牌"""
     print("\n" + "="*60)
-    print("测试场景3：首次出牌 - 手牌中有三张")
+    print(f"测试场景{scenario}：首次出牌 - 手牌中有{label}")
     print("="*60)
     
-    # 构造测试手牌：包含三张5
-    hand = parse_cards([
-        {"color": "♠", "number": 3},
-        {"color": "♠", "number": 5},
-        {"color": "♥", "number": 5},
-        {"color": "♦", "number": 5},
-        {"color": "♠", "number": 7},
-        {"color": "♥", "number": 9},
-        {"color": "♦", "number": "J"},
-    ])
-    
     print(f"手牌：{[f'{c.color}{c.number}' for c in hand]}")
     
     # 测试新AI
-    AIConfig.ALGORITHM = "improved"
-    ai = create_ai(level=2)
+    ai = _get_ai("improved", 2)
     play = ai.find_best_play(hand, [])
     
     print(f"\n新AI出牌：{[f'{c.color}{c.number}' for c in play]}")
     print(f"出牌数量：{len(play)}")
     
-    if len(play) == 3:
-        print("✅ 测试通过：AI出了三张（3张牌）")
-    elif len(play) == 1:
-        print("❌ 测试失败：AI出了单牌")
-    else:
-        print(f"⚠️  AI出了{len(play)}张牌")
+    assert len(play) == expected, f"AI出了{len(play)}张牌（预期{label}{expected}张）"
 
 
 def test_hand_quality_evaluation():
@@ -122,29 +122,12 @@ def test_hand_quality_evaluation():
     print("="*60)
     
     # 好手牌：有顺子和对子
-    good_hand = parse_cards([
-        {"color": "♠", "number": 5},
-        {"color": "♠", "number": 6},
-        {"color": "♠", "number": 7},
-        {"color": "♠", "number": 8},
-        {"color": "♠", "number": 9},
-        {"color": "♥", "number": 10},
-        {"color": "♦", "number": 10},
-    ])
+    good_hand = _HAND_GOOD
     
     # 差手牌：都是孤立牌
-    bad_hand = parse_cards([
-        {"color": "♠", "number": 3},
-        {"color": "♥", "number": 5},
-        {"color": "♦", "number": 7},
-        {"color": "♣", "number": 9},
-        {"color": "♠", "number": "J"},
-        {"color": "♥", "number": "K"},
-        {"color": "♦", "number": "A"},
-    ])
-    
-    AIConfig.ALGORITHM = "improved"
-    ai = create_ai(level=2)
+    bad_hand = _HAND_BAD
+    
+    ai = _get_ai("improved", 2)
     
     good_quality = ai._evaluate_hand_quality(good_hand)
     bad_quality = ai._evaluate_hand_quality(bad_hand)
@@ -152,10 +135,7 @@ def test_hand_quality_evaluation():
     print(f"好手牌质量分：{good_quality:.2f}")
     print(f"差手牌质量分：{bad_quality:.2f}")
     
-    if good_quality > bad_quality:
-        print("✅ 测试通过：好手牌质量分高于差手牌")
-    else:
-        print("❌ 测试失败：质量评估有问题")
+    assert good_quality > bad_quality, "质量评估有问题：好手牌质量分不高于差手牌"
 
 
 def test_isolated_card_detection():
@@ -165,77 +145,125 @@ def test_isolated_card_detection():
     print("="*60)
     
     # 包含孤立牌的手牌
-    hand = parse_cards([
-        {"color": "♠", "number": 3},  # 孤立
-        {"color": "♥", "number": 5},
-        {"color": "♦", "number": 5},  # 对子，不孤立
-        {"color": "♣", "number": 7},  # 孤立
-        {"color": "♠", "number": 9},
-        {"color": "♥", "number": 9},
-        {"color": "♦", "number": 9},  # 三张，不孤立
-    ])
-    
-    AIConfig.ALGORITHM = "improved"
-    ai = create_ai(level=2)
+    hand = _HAND_ISOLATED
+    
+    ai = _get_ai("improved", 2)
     
     isolated_count = ai._count_isolated_cards(hand)
     
     print(f"手牌：{[f'{c.color}{c.number}' for c in hand]}")
     print(f"孤立牌数量：{isolated_count}")
     
-    if isolated_count == 2:  # 3和7是孤立的
-        print("✅ 测试通过：正确识别了孤立牌")
-    else:
-        print(f"⚠️  识别到{isolated_count}张孤立牌（预期2张）")
+    # 张数不超过孤立牌阈值（2）的点数都算孤立：3、7 和一对5
+    assert isolated_count == 4, f"识别到{isolated_count}张孤立牌（预期4张）"
 
 
-def test_algorithm_switching():
-    """测试场景6：算法切换"""
-    print("\n" + "="*60)
-    print("测试场景6：算法切换功能")
-    print("="*60)
+@pytest.mark.parametrize("hand, last, expected", [
+    # 首出：两副牌的重复3组成炸弹，带对6出三带二
+    ([("♠", 3), ("♠", 3), ("♥", 3), ("♥", 3), ("♠", 6), ("♠", 6), ("♦", 9),
+      ("Joker", 15), ("Joker", 16)], [],
+     [("♠", 3), ("♠", 3), ("♥", 3), ("♠", 6), ("♠", 6)]),
+    # 首出：重复牌组成的三连对
+    ([("♠", 4), ("♠", 4), ("♥", 5), ("♥", 5), ("♦", 6), ("♦", 6), ("♣", 10),
+      ("Joker", 15), ("Joker", 15)], [],
+     [("♠", 4), ("♠", 4), ("♥", 5), ("♥", 5), ("♦", 6), ("♦", 6)]),
+    # 跟单牌：不拆炸弹，用小王压
+    ([("♠", 4), ("♠", 4), ("♥", 4), ("♦", 4), ("Joker", 15), ("Joker", 16), ("♠", 7)],
+     [("♣", 13)], [("Joker", 15)]),
+    # 跟对子：出重复的对8，不拆三张9
+    ([("♠", 8), ("♠", 8), ("♥", 9), ("♥", 9), ("♥", 9), ("Joker", 15), ("Joker", 15)],
+     [("♣", 5), ("♦", 5)], [("♠", 8), ("♠", 8)]),
+    # 跟对A：只有一对小王压得住
+    ([("♠", 8), ("♠", 8), ("♥", 9), ("♥", 9), ("♥", 9), ("Joker", 15), ("Joker", 15)],
+     [("♣", 1), ("♦", 1)], [("Joker", 15), ("Joker", 15)]),
+    # 跟炸弹：用更大的四张9，留着五张3
+    ([("♠", 3), ("♠", 3), ("♥", 3), ("♥", 3), ("♦", 3), ("♠", 9), ("♠", 9), ("♥", 9), ("♥", 9)],
+     [("♣", 6), ("♦", 6), ("♠", 6), ("♥", 6)],
+     [("♠", 9), ("♠", 9), ("♥", 9), ("♥", 9)]),
+    # 跟五张炸弹：天王炸
+    ([("♠", 10), ("Joker", 15), ("Joker", 15), ("Joker", 16), ("Joker", 16), ("♠", 9)],
+     [("♣", 6), ("♦", 6), ("♠", 6), ("♥", 6), ("♥", 6)],
+     [("Joker", 15), ("Joker", 15), ("Joker", 16), ("Joker", 16)]),
+    # 跟顺子：重复的5和8各只出一张
+    ([("♠", 4), ("♠", 5), ("♠", 5), ("♥", 6), ("♦", 7), ("♣", 8), ("♣", 8), ("Joker", 15)],
+     [("♣", 3), ("♦", 4), ("♠", 5), ("♥", 6), ("♥", 7)],
+     [("♠", 4), ("♠", 5), ("♥", 6), ("♦", 7), ("♣", 8)]),
+])
+def test_fixed_hand_plays(hand, last, expected):
+    """固定手牌回归：重复牌、炸弹和王下的首出与跟牌结果"""
+    ai = _get_ai("improved", 2)
+    play = ai.find_best_play(parse_cards_fast(hand), parse_cards_fast(last))
     
-    # 测试切换到improved
-    AIConfig.set_algorithm("improved")
-    ai1 = create_ai(level=2)
-    print(f"算法1：{ai1.get_strategy_name()}")
+    assert [(c.color, c.number) for c in play] == expected
+
+
+@pytest.mark.parametrize("hand, pair_number", [
+    # 9对在前：同代价的两种三带二按手牌顺序取先出现的对子
+    ([("♠", 9), ("♥", 9), ("♠", 5), ("♥", 5), ("♦", 5), ("♠", 7), ("♥", 7), ("♣", 13)], 9),
+    ([("♠", 7), ("♥", 7), ("♠", 5), ("♥", 5), ("♦", 5), ("♠", 9), ("♥", 9), ("♣", 13)], 7),
+])
+def test_fullhouse_pair_tie_break(hand, pair_number):
+    """三带二代价相同时，带的对子取手牌中先出现的那一对"""
+    last = parse_cards_fast([("♠", 3), ("♥", 3), ("♦", 3), ("♠", 4), ("♥", 4)])
+    ai = _get_ai("improved", 2)
+    play = ai.find_best_play(parse_cards_fast(hand), last)
+
+    assert sorted(c.number for c in play) == sorted([5, 5, 5, pair_number, pair_number])
+
+
+@pytest.mark.parametrize("enable_cost_scoring, number", [
+    # 按成本选牌：出8不拆对6
+    (True, 8),
+    # 关闭成本评分：直接出最小的可压牌，拆开对6
+    (False, 6),
+])
+def test_cost_scoring_switch(enable_cost_scoring, number):
+    """跟牌时 enable_cost_scoring 开关决定是否为保留对子而出更大的单牌"""
+    hand = parse_cards_fast([("♠", 6), ("♥", 6), ("♦", 8)])
+    last = parse_cards_fast([("♣", 4)])
+    ai = _get_ai("improved", 2)
     
-    # 测试切换到advanced（当前使用improved实现）
-    AIConfig.set_algorithm("advanced")
-    ai2 = create_ai(level=2)
-    print(f"算法2：{ai2.get_strategy_name()}")
+    saved = AIConfig.IMPROVED_CONFIG["enable_cost_scoring"]
+    AIConfig.IMPROVED_CONFIG["enable_cost_scoring"] = enable_cost_scoring
+    try:
+        play = ai.find_best_play(hand, last)
+    finally:
+        AIConfig.IMPROVED_CONFIG["enable_cost_scoring"] = saved
     
-    print("✅ 算法切换功能正常")
+    assert [c.number for c in play] == [number]
 
 
-def run_all_tests():
-    """运行所有测试"""
-    print("\n" + "🎮 " + "="*58)
-    print("🎮  掼蛋AI升级测试套件")
-    print("🎮 " + "="*58)
+def test_algorithm_switching():
+    """测试场景6：算法切换"""
+    print("\n" + "="*60)
+    print("测试场景6：算法切换功能")
+    print("="*60)
     
+    saved = AIConfig.ALGORITHM
     try:
-        test_first_move_with_straight()
-        test_first_move_with_pairs()
-        test_first_move_with_triple()
-        test_hand_quality_evaluation()
-        test_isolated_card_detection()
-        test_algorithm_switching()
+        # 按参数选算法（advanced 当前使用 improved 实现）
+        for algorithm in ("improved", "advanced"):
+            ai = create_ai(level=2, algorithm=algorithm)
+            print(f"{algorithm}：{ai.get_strategy_name()}")
+            assert isinstance(ai, ImprovedGuandanAI)
         
-        print("\n" + "="*60)
-        print("✅ 所有测试完成！")
-        print("="*60)
-        print("\n💡 提示：")
-        print("  - 如果测试失败，请检查 config/ai_config.py 中的配置")
-        print("  - 确保 enable_smart_first_move = True")
-        print("  - 可以调整成本权重来优化AI行为")
-        print("\n📖 详细文档请查看：AI_UPGRADE_GUIDE.md")
+        # 不传参数时按全局配置选算法
+        AIConfig.set_algorithm("advanced")
+        assert isinstance(create_ai(level=2), ImprovedGuandanAI)
         
-    except Exception as e:
-        print(f"\n❌ 测试过程中出现错误：{e}")
-        import traceback
-        traceback.print_exc()
+        with pytest.raises(ValueError):
+            create_ai(level=2, algorithm="unknown")
+    finally:
+        AIConfig.ALGORITHM = saved
+
+
+def run_all_tests():
+    """
+    运行所有测试（需先 pip install -r requirements-dev.txt 安装 pytest；
+    各测试互不依赖，装有 pytest-xdist 时可用 -n auto 并行）
+    """
+    return pytest.main([__file__, "-s", "-q"])
 
 
 if __name__ == "__main__":
-    run_all_tests()
+    raise SystemExit(run_all_tests())